@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of serializing course listings to a JSON response.
+
+Compares, per 1,000 courses shaped like a GET /api/courses page (columns,
+embedded instructor and HATEOAS links):
+
+- before: ``to_dict`` calling ``isoformat()`` on every timestamp, encoded by
+  Flask's default (stdlib ``json``) provider
+- fallback: ``FastJSONProvider`` without orjson installed
+- after: ``FastJSONProvider`` with orjson, timestamps encoded natively
+
+Run from the repository root:
+
+    python benchmarks/json_serialization.py [--courses 1000] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from middleware import json_provider
+from middleware.json_provider import FastJSONProvider
+from services.course_service.models.database import Course
+from services.course_service.routes.courses import course_link_builder
+
+
+def make_courses(count):
+    start = datetime(2025, 1, 1, 9, 30, 15, 123456)
+    return [
+        Course(
+            id=index,
+            title=f'Course {index:05d}',
+            description='An introduction to the topic, with weekly exercises and a final project. ' * 2,
+            instructor_id=index % 50 + 1,
+            category=('tech', 'arts', 'science', 'business')[index % 4],
+            rating=round(index % 50 / 10, 1),
+            max_students=50,
+            enrolled_count=index % 50,
+            created_at=start + timedelta(minutes=index),
+            updated_at=start + timedelta(minutes=index, seconds=30)
+        )
+        for index in range(1, count + 1)
+    ]
+
+
+def isoformat_dict(course):
+    """``Course.to_dict`` as it was before: every timestamp converted with isoformat()"""
+    data = course.to_dict()
+    for field in ('created_at', 'updated_at'):
+        data[field] = data[field].isoformat() if data[field] else None
+    return data
+
+
+def page(courses, to_dict):
+    build_links = course_link_builder('http://localhost:5003')
+    items = []
+    for course in courses:
+        data = to_dict(course)
+        data['instructor'] = {'id': course.instructor_id, 'name': 'Jane Smith', 'email': 'jane@example.com',
+                              'role': 'teacher', 'created_at': '2025-01-01T00:00:00'}
+        data['_links'] = build_links(course.id, course.instructor_id)
+        items.append(data)
+    return {'courses': items, 'pagination': {'page': 1, 'limit': len(items), 'total': len(items)}}
+
+
+def measure(app, provider, to_dict, courses, repeat):
+    """Best ``(build + encode, encode only)`` seconds and the response size"""
+    built = page(courses, to_dict)
+
+    def build_and_encode():
+        provider.response(page(courses, to_dict)).get_data()
+
+    def encode():
+        provider.response(built).get_data()
+
+    with app.app_context():
+        build_and_encode()  # warm up
+        total = min(timeit.repeat(build_and_encode, number=1, repeat=repeat))
+        encoding = min(timeit.repeat(encode, number=1, repeat=repeat))
+        size = len(provider.response(built).get_data())
+    return total, encoding, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--courses', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    courses = make_courses(args.courses)
+    orjson = json_provider.orjson
+
+    results = [('before (stdlib json, isoformat in to_dict)',
+                *measure(app, DefaultJSONProvider(app), isoformat_dict, courses, args.repeat))]
+
+    json_provider.orjson = None
+    try:
+        results.append(('fallback (FastJSONProvider, no orjson)',
+                        *measure(app, FastJSONProvider(app), Course.to_dict, courses, args.repeat)))
+    finally:
+        json_provider.orjson = orjson
+
+    if orjson is not None:
+        results.append(('after (FastJSONProvider, orjson)',
+                        *measure(app, FastJSONProvider(app), Course.to_dict, courses, args.repeat)))
+    else:
+        print('orjson is not installed: only the fallback provider was measured')
+
+    baseline = results[0][1]
+    scale = 1000 / args.courses * 1000  # seconds per run -> ms per 1,000 courses
+    print(f"Serializing {args.courses} courses (best of {args.repeat}), ms per 1,000 courses")
+    print(f"  {'':<45} {'build+encode':>12} {'encode':>8} {'speedup':>8} {'size':>11}")
+    for name, total, encoding, size in results:
+        print(f"  {name:<45} {total * scale:12.2f} {encoding * scale:8.2f} {baseline / total:7.1f}x"
+              f" {size / 1024:7.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+Queue-backed, sampled access log written as JSON lines by a background thread
+"""
+
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import g, request
+
+from middleware.request_timing import init_request_timing, request_timings
+
+
+def parse_sample_rates(value):
+    """Parse ``"/=0,/docs*=0.05"`` into ``{path_or_prefix*: rate}``.
+
+    A trailing ``*`` makes the rule a path prefix; otherwise it matches the
+    exact path. Rates are clamped to [0, 1].
+    """
+    rates = {}
+    for rule in (value or '').split(','):
+        if not rule.strip():
+            continue
+        path, _, rate = rule.partition('=')
+        rates[path.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class AccessLog:
+    """Structured access log that keeps I/O off the request path.
+
+    ``after_request`` only puts a small tuple on a bounded queue; a daemon
+    thread drains it, formats each record as a JSON line (method, path,
+    status, duration, DB and upstream time) and writes a whole batch with one
+    write and flush. If the queue is full, records are dropped and counted
+    rather than blocking requests. ``sample_rates`` maps exact paths (or
+    ``prefix*``) to the fraction of requests logged; server errors are
+    always logged.
+    """
+
+    _STOP = object()
+
+    def __init__(self, service, stream=None, sample_rates=None, max_queue=10000,
+                 batch_size=500, flush_interval=0.5, enabled=True):
+        self.service = service
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._exact_rates = {}
+        self._prefix_rates = []
+        for path, rate in (sample_rates or {}).items():
+            if path.endswith('*'):
+                self._prefix_rates.append((path[:-1], rate))
+            else:
+                self._exact_rates[path] = rate
+        # Longest prefix wins
+        self._prefix_rates.sort(key=lambda rule: len(rule[0]), reverse=True)
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._counters = {'logged': 0, 'sampled_out': 0, 'dropped': 0, 'written': 0, 'batches': 0}
+
+    @classmethod
+    def from_env(cls, service):
+        """Build an access log configured from ACCESS_LOG_* environment variables"""
+        return cls(
+            service,
+            sample_rates=parse_sample_rates(os.getenv('ACCESS_LOG_SAMPLE_RATES', '/=0.01')),
+            max_queue=int(os.getenv('ACCESS_LOG_QUEUE_SIZE', 10000)),
+            batch_size=int(os.getenv('ACCESS_LOG_BATCH_SIZE', 500)),
+            flush_interval=float(os.getenv('ACCESS_LOG_FLUSH_INTERVAL', 0.5)),
+            enabled=os.getenv('ACCESS_LOG_ENABLED', 'true').lower() != 'false'
+        )
+
+    def init_app(self, app):
+        """Log every request of ``app`` (and time its SQL statements)"""
+        init_request_timing(app)
+
+        @app.before_request
+        def start_access_log_timer():
+            g._access_log_started = time.perf_counter()
+
+        @app.after_request
+        def enqueue_access_log(response):
+            started = g.get('_access_log_started')
+            if started is not None:
+                timings = request_timings()
+                self.log((
+                    time.time(), request.method, request.path, response.status_code,
+                    time.perf_counter() - started, timings.get('db'), timings.get('upstream')
+                ))
+            return response
+
+        return self
+
+    def sample_rate(self, path):
+        """Fraction of requests to ``path`` that are logged"""
+        rate = self._exact_rates.get(path)
+        if rate is not None:
+            return rate
+        for prefix, rate in self._prefix_rates:
+            if path.startswith(prefix):
+                return rate
+        return 1.0
+
+    def log(self, record):
+        """Queue ``(timestamp, method, path, status, seconds, db, upstream)`` for writing.
+
+        ``db`` and ``upstream`` are ``(seconds, calls)`` or None. Returns
+        whether the record was queued.
+        """
+        if not self.enabled:
+            return False
+
+        status = record[3]
+        rate = self.sample_rate(record[2])
+        if status < 500 and rate < 1.0 and random.random() >= rate:
+            self._increment('sampled_out')
+            return False
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._increment('dropped')
+            return False
+        self._increment('logged')
+        return True
+
+    def close(self, timeout=2.0):
+        """Write out queued records and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(self._STOP)
+            thread.join(timeout)
+
+    def stats(self):
+        """Logged/sampled-out/dropped/written counters and the current queue depth"""
+        with self._lock:
+            return dict(self._counters, queued=self._queue.qsize())
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            # Started lazily, so a worker forked after create_app() gets its own thread
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is self._STOP
+            records = [record for record in batch if record is not self._STOP]
+            if records:
+                self._write(records)
+            if stop:
+                return
+
+    def _write(self, records):
+        lines = ''.join(self._format(record) for record in records)
+        stream = self.stream or sys.stdout
+        try:
+            stream.write(lines)
+            stream.flush()
+        except (OSError, ValueError) as e:
+            print(f"Access log write failed: {e}", file=sys.stderr)
+            return
+        with self._lock:
+            self._counters['written'] += len(records)
+            self._counters['batches'] += 1
+
+    def _format(self, record):
+        timestamp, method, path, status, seconds, db, upstream = record
+        entry = {
+            'ts': datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='milliseconds'),
+            'service': self.service,
+            'method': method,
+            'path': path,
+            'status': status,
+            'duration_ms': round(seconds * 1000, 2),
+            'db_ms': round(db[0] * 1000, 2) if db else 0.0,
+            'db_queries': db[1] if db else 0,
+            'upstream_ms': round(upstream[0] * 1000, 2) if upstream else 0.0,
+            'upstream_calls': upstream[1] if upstream else 0
+        }
+        return json.dumps(entry, separators=(',', ':')) + '\n'
+
+    def _increment(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
@@ -0,0 +1,26 @@
+"""
+API key guard for operational and analytics endpoints
+"""
+
+import hmac
+import os
+from functools import wraps
+
+from flask import jsonify, request
+
+
+def has_valid_api_key():
+    """Check the ``?apiKey=`` query parameter against ANALYTICS_API_KEY"""
+    api_key = request.args.get('apiKey')
+    expected_key = os.getenv('ANALYTICS_API_KEY', 'validKey')
+    return bool(api_key) and hmac.compare_digest(api_key, expected_key)
+
+
+def require_api_key(f):
+    """Decorator to require a valid ``?apiKey=`` (401 otherwise)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not has_valid_api_key():
+            return jsonify({'error': 'Valid API key required. Use ?apiKey=validKey'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,232 @@
+"""
+In-process metrics exposed at /metrics in the Prometheus text format
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+from flask import current_app, g, request
+
+# Latency buckets in seconds, upper bounds (+Inf is implied)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_Family = namedtuple('_Family', 'name kind documentation labelnames buckets callback')
+
+
+class Metrics:
+    """Counters, gauges and histograms cheap enough to leave on in production.
+
+    Every thread records into its own shard (a plain dict reached through a
+    ``threading.local``), so ``inc`` and ``observe`` take no lock. Scrapes sum
+    the shards; shards of threads that have exited are folded into a retired
+    total, so thread-per-request servers do not grow the shard list. Values
+    are per process: with several workers, scrape each one.
+    """
+
+    def __init__(self):
+        self._families = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+        self._pools = []
+
+    def counter(self, name, documentation, labelnames=()):
+        """Register a monotonically increasing counter"""
+        return self._register(name, 'counter', documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        """Register a gauge, moved with ``inc`` or read from ``callback()`` at scrape time.
+
+        ``callback`` returns a number, or ``{labelvalues: number}`` for
+        labelled gauges.
+        """
+        return self._register(name, 'gauge', documentation, labelnames, callback=callback)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Register a histogram with cumulative ``le`` buckets, ``_sum`` and ``_count``"""
+        return self._register(name, 'histogram', documentation, labelnames, buckets=tuple(sorted(buckets)))
+
+    def inc(self, name, *labelvalues, amount=1):
+        """Add ``amount`` to a counter or gauge series"""
+        values = self._shard()
+        key = (name, labelvalues)
+        values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, value, *labelvalues):
+        """Record ``value`` in a histogram series"""
+        buckets = self._families[name].buckets
+        values = self._shard()
+        key = (name, labelvalues)
+        series = values.get(key)
+        if series is None:
+            # One count per bucket (the last is +Inf), then the sum
+            series = values[key] = [0] * (len(buckets) + 1) + [0.0]
+        series[bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def init_app(self, app, path='/metrics'):
+        """Record request latency/in-flight metrics for ``app``, time its pool checkouts and serve ``path``"""
+        self.histogram('http_request_duration_seconds',
+                       'Request latency by endpoint, method and status (_count is the request count)',
+                       ('endpoint', 'method', 'status'))
+        self.gauge('http_requests_in_flight', 'Requests currently being handled')
+
+        @app.before_request
+        def start_request_metrics():
+            g._metrics_started = time.perf_counter()
+            g._metrics_in_flight = True
+            self.inc('http_requests_in_flight')
+
+        @app.after_request
+        def record_request_metrics(response):
+            started = g.pop('_metrics_started', None)
+            if started is not None:
+                self.observe('http_request_duration_seconds', time.perf_counter() - started,
+                             request.endpoint or 'unmatched', request.method, str(response.status_code))
+            return response
+
+        @app.teardown_request
+        def finish_request_metrics(exc):
+            # Teardown runs even when the response could not be finalized
+            if g.pop('_metrics_in_flight', False):
+                self.inc('http_requests_in_flight', amount=-1)
+
+        sqlalchemy = app.extensions.get('sqlalchemy')
+        if sqlalchemy is not None:
+            with app.app_context():
+                for engine in sqlalchemy.engines.values():
+                    self.instrument_pool(engine.pool)
+
+        app.add_url_rule(path, 'metrics', self.metrics_response)
+        return self
+
+    def instrument_pool(self, pool):
+        """Count checkouts from a SQLAlchemy pool and time how long each one waits"""
+        self.counter('db_pool_checkouts_total', 'Connections checked out of the pool')
+        self.histogram('db_pool_checkout_seconds',
+                       'Time to get a pooled connection, waiting for a free one included')
+        self.gauge('db_pool_checked_out', 'Connections currently checked out of the pool',
+                   callback=self._checked_out)
+
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                self.inc('db_pool_checkouts_total')
+                self.observe('db_pool_checkout_seconds', time.perf_counter() - started)
+
+        pool.connect = timed_connect
+        self._pools.append(pool)
+
+    def metrics_response(self):
+        """``/metrics`` view: current values in the Prometheus text format"""
+        return current_app.response_class(self.render(), content_type=CONTENT_TYPE)
+
+    def render(self):
+        """All registered metrics in the Prometheus text exposition format"""
+        totals = self._collect()
+        by_family = {}
+        for (name, labelvalues), value in totals.items():
+            by_family.setdefault(name, []).append((labelvalues, value))
+
+        lines = []
+        for family in list(self._families.values()):
+            samples = by_family.get(family.name, [])
+            if family.callback is not None:
+                value = family.callback()
+                samples = list(value.items()) if isinstance(value, dict) else [((), value)]
+
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labelvalues, value in sorted(samples, key=lambda sample: sample[0]):
+                labels = list(zip(family.labelnames, labelvalues))
+                if family.kind == 'histogram':
+                    lines.extend(self._histogram_lines(family, labels, value))
+                else:
+                    lines.append(f"{family.name}{_labels(labels)} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def _histogram_lines(self, family, labels, series):
+        cumulative = 0
+        for bound, count in zip(family.buckets + ('+Inf',), series):
+            cumulative += count
+            le = bound if bound == '+Inf' else _number(bound)
+            yield f"{family.name}_bucket{_labels(labels + [('le', le)])} {cumulative}"
+        yield f"{family.name}_sum{_labels(labels)} {_number(series[-1])}"
+        yield f"{family.name}_count{_labels(labels)} {cumulative}"
+
+    def _register(self, name, kind, documentation, labelnames, buckets=(), callback=None):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = _Family(name, kind, documentation, tuple(labelnames),
+                                                    buckets, callback)
+        return family
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    def _collect(self):
+        with self._lock:
+            live = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    _merge(self._retired, values)
+            self._shards = live
+            totals = _merge({}, self._retired)
+
+        for _, values in live:
+            _merge(totals, values)
+        return totals
+
+    def _checked_out(self):
+        return sum(pool.checkedout() for pool in self._pools if hasattr(pool, 'checkedout'))
+
+
+def _merge(into, values):
+    """Add a shard's series into ``into`` (the owning thread may still be writing)"""
+    for key, value in list(values.items()):
+        current = into.get(key)
+        if isinstance(value, list):
+            value = list(value)
+            into[key] = value if current is None else [a + b for a, b in zip(current, value)]
+        else:
+            into[key] = value if current is None else current + value
+    return into
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# Shared registry; METRICS_ENABLED=false leaves /metrics and the request hooks out
+metrics = Metrics()
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() != 'false'
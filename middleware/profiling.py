@@ -0,0 +1,141 @@
+"""
+On-demand cProfile profiling of single requests, for admins
+"""
+
+import cProfile
+import hmac
+import os
+import pstats
+import re
+import sys
+import time
+import uuid
+
+from flask import g, jsonify, request
+
+# Off by default: without it no profiling hooks are registered at all
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', 30))
+# Saved profiles kept in PROFILE_DIR; the oldest are deleted beyond this
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 100))
+# Dedicated secret for key-gated profiling; no default, so it must be set to profile
+PROFILING_API_KEY = os.getenv('PROFILING_API_KEY')
+
+PROFILE_MODES = ('top', 'save')
+
+# Client request IDs become file names, so only plain tokens are accepted
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+def has_profiling_key():
+    """Check the ``X-Profiling-Key`` header against PROFILING_API_KEY (never a query parameter)"""
+    key = request.headers.get('X-Profiling-Key')
+    return bool(PROFILING_API_KEY) and bool(key) and hmac.compare_digest(key, PROFILING_API_KEY)
+
+
+def init_profiling(app, is_admin=has_profiling_key):
+    """Profile requests that ask for it (``?profile=top|save`` or ``X-Profile``) when ``is_admin()``.
+
+    ``top`` replaces the response with the ``PROFILE_TOP_N`` functions by
+    cumulative time; ``save`` keeps the response and writes
+    ``PROFILE_DIR/<request id>.pstats`` (named in ``X-Profile-File``),
+    keeping at most ``PROFILE_MAX_FILES``. Does nothing unless
+    PROFILING_ENABLED is set, and refuses key-gated profiling while
+    PROFILING_API_KEY is unset. Only code that runs before the response is
+    returned is profiled, not streamed bodies.
+    """
+    if not PROFILING_ENABLED:
+        return
+    if is_admin is has_profiling_key and not PROFILING_API_KEY:
+        print("PROFILING_ENABLED is set but PROFILING_API_KEY is not: profiling stays off", file=sys.stderr)
+        return
+
+    @app.before_request
+    def start_profile():
+        mode = request.args.get('profile') or request.headers.get('X-Profile')
+        if mode not in PROFILE_MODES or not is_admin():
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this interpreter
+            return
+        g._profile = (profiler, mode, time.perf_counter())
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        profiler, mode, started = profile
+        profiler.disable()
+        duration = time.perf_counter() - started
+
+        request_id = request.headers.get('X-Request-ID', '')
+        if not _REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        if mode == 'save':
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            filename = f"{request_id}.pstats"
+            profiler.dump_stats(os.path.join(PROFILE_DIR, filename))
+            prune_profiles(PROFILE_DIR, PROFILE_MAX_FILES)
+            response.headers['X-Profile-File'] = filename
+            return response
+
+        report = jsonify({
+            'profile': {
+                'request_id': request_id,
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'sort': 'cumulative',
+                'functions': top_functions(profiler, PROFILE_TOP_N)
+            }
+        })
+        report.headers['X-Request-ID'] = request_id
+        return report
+
+    @app.teardown_request
+    def stop_profile(exc):
+        # The response was never finalized: make sure the profiler is off
+        profile = g.pop('_profile', None)
+        if profile is not None:
+            profile[0].disable()
+
+
+def prune_profiles(directory, max_files):
+    """Delete the oldest ``.pstats`` files in ``directory`` beyond ``max_files``"""
+    with os.scandir(directory) as entries:
+        files = [entry for entry in entries if entry.is_file() and entry.name.endswith('.pstats')]
+    files.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in files[max_files:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            # Pruned concurrently by another request or worker
+            pass
+
+
+def top_functions(profiler, limit):
+    """The ``limit`` functions with the highest cumulative time"""
+    stats = pstats.Stats(profiler)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    functions = []
+    for func in stats.fcn_list[:limit]:
+        filename, line, name = func
+        primitive_calls, calls, total, cumulative, _ = stats.stats[func]
+        functions.append({
+            'function': name,
+            'file': filename,
+            'line': line,
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        })
+    return functions
@@ -0,0 +1,103 @@
+"""
+Per-request timers for database and upstream (service-to-service HTTP) work
+"""
+
+import os
+import sys
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements slower than this are logged with their parameters
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+# Warn when one statement shape runs more than this many times in a request (likely N+1)
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', 10))
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() != 'false'
+
+# Server-Timing descriptions: "<calls> <unit>", singular and plural
+_UNITS = {'db': ('query', 'queries')}
+
+
+def init_request_timing(app):
+    """Reset timers per request, time SQL statements and report totals in ``Server-Timing``"""
+    if 'request_timing' in app.extensions:
+        return
+    app.extensions['request_timing'] = True
+    instrument_queries()
+    app.before_request(reset_timings)
+    if SERVER_TIMING_ENABLED:
+        app.after_request(add_server_timing)
+
+
+def reset_timings():
+    """Start the current request with empty timers"""
+    g._request_timings = {}
+    g._statement_counts = {}
+    g._request_timing_started = time.perf_counter()
+
+
+def add_timing(name, seconds):
+    """Add one call of ``seconds`` to the current request's ``name`` timer (no-op outside a request)"""
+    if not has_request_context():
+        return
+    timings = g.setdefault('_request_timings', {})
+    total, calls = timings.get(name, (0.0, 0))
+    timings[name] = (total + seconds, calls + 1)
+
+
+def request_timings():
+    """``{name: (seconds, calls)}`` recorded so far for the current request"""
+    if not has_request_context():
+        return {}
+    return g.get('_request_timings', {})
+
+
+def add_server_timing(response):
+    """``after_request`` hook: ``Server-Timing: db;dur=4.10;desc="3 queries", ..., total;dur=12.50``"""
+    entries = [
+        f'{name};dur={seconds * 1000:.2f};desc="{calls} {_UNITS.get(name, ("call", "calls"))[calls != 1]}"'
+        for name, (seconds, calls) in request_timings().items()
+    ]
+    started = g.get('_request_timing_started')
+    if started is not None:
+        entries.append(f'total;dur={(time.perf_counter() - started) * 1000:.2f}')
+    if entries:
+        response.headers.add('Server-Timing', ', '.join(entries))
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._timing_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._timing_started
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        where = f" on {request.method} {request.path}" if has_request_context() else ''
+        print(f"Slow query ({elapsed * 1000:.1f} ms){where}: {statement} params={_truncate(parameters)}",
+              file=sys.stderr)
+
+    if not has_request_context():
+        return
+    add_timing('db', elapsed)
+
+    # Parameters are bound, so the SQL text is the same for every row: it is the statement shape
+    counts = g.setdefault('_statement_counts', {})
+    count = counts[statement] = counts.get(statement, 0) + 1
+    if count == QUERY_REPEAT_THRESHOLD + 1:
+        print(f"Possible N+1 on {request.method} {request.path}: statement ran more than "
+              f"{QUERY_REPEAT_THRESHOLD} times: {statement}", file=sys.stderr)
+
+
+def _truncate(parameters, limit=500):
+    text = repr(parameters)
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text)} chars)"
+
+
+def instrument_queries():
+    """Time every SQL statement, on any engine, into the current request's ``db`` timer"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,115 @@
+"""
+Stale-while-revalidate cache for computed response payloads
+"""
+
+import os
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+# Cache states reported to callers (and in the X-Cache response header)
+HIT = 'hit'
+STALE = 'stale'
+MISS = 'miss'
+
+
+def _spawn_thread(target):
+    threading.Thread(target=target, name='response-cache-refresh', daemon=True).start()
+
+
+class ResponseCache:
+    """TTL cache that serves stale values while one background refresh runs.
+
+    A value younger than ``ttl`` is a HIT. Once it expires it is still served
+    (STALE) for up to ``max_stale`` more seconds while a single background
+    refresh recomputes it, so any number of concurrent callers trigger at most
+    one recompute per key. Missing or too-stale values are computed inline,
+    also once per key: concurrent callers wait for the first computation.
+    A ``ttl`` of 0 disables caching.
+    """
+
+    def __init__(self, ttl=5.0, max_stale=60.0, clock=time.monotonic, spawn=_spawn_thread):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._clock = clock
+        self._spawn = spawn
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (stored_at, value)
+        self._refreshing = set()
+        self._compute_locks = {}
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache configured from ANALYTICS_CACHE_* environment variables"""
+        return cls(
+            ttl=float(os.getenv('ANALYTICS_CACHE_TTL', 5)),
+            max_stale=float(os.getenv('ANALYTICS_CACHE_MAX_STALE', 60))
+        )
+
+    def get(self, key, compute):
+        """Return ``(value, age_seconds, state)`` for ``key``, calling ``compute()`` as needed"""
+        if self.ttl <= 0:
+            return compute(), 0.0, MISS
+
+        stale = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                age = self._clock() - stored_at
+                if age < self.ttl:
+                    return value, age, HIT
+                if age < self.ttl + self.max_stale:
+                    start_refresh = key not in self._refreshing
+                    self._refreshing.add(key)
+                    stale = (value, age, STALE)
+            compute_lock = self._compute_locks.setdefault(key, threading.Lock())
+
+        if stale is not None:
+            if start_refresh:
+                self._start_refresh(key, compute)
+            return stale
+
+        with compute_lock:
+            # Another caller may have filled the entry while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and self._clock() - entry[0] < self.ttl:
+                    return entry[1], self._clock() - entry[0], HIT
+
+            value = compute()
+            with self._lock:
+                self._entries[key] = (self._clock(), value)
+            return value, 0.0, MISS
+
+    def _start_refresh(self, key, compute):
+        # Background refreshes need the app context of the request that triggered them
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def refresh():
+            try:
+                if app is not None:
+                    with app.app_context():
+                        value = compute()
+                else:
+                    value = compute()
+            except Exception as e:
+                print(f"Background refresh of {key!r} failed, serving stale value: {e}")
+            else:
+                with self._lock:
+                    self._entries[key] = (self._clock(), value)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._spawn(refresh)
+
+    def clear(self):
+        """Drop every cached value"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared cache for analytics payloads
+analytics_cache = ResponseCache.from_env()
@@ -0,0 +1,53 @@
+"""
+Serve an OpenAPI spec from bytes built and serialized once per process
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+from flask import current_app, request
+
+# Cache lifetime (seconds) for /swagger.json and the Swagger UI static assets
+SWAGGER_CACHE_MAX_AGE = int(os.getenv('SWAGGER_CACHE_MAX_AGE', 86400))
+
+
+def cached_spec_response(build_spec):
+    """Return a ``/swagger.json`` view serving ``build_spec()`` from cached bytes.
+
+    The spec is built and serialized on first use (call ``view.serialized()``
+    at startup to do it eagerly) into ``(json_bytes, gzip_bytes, etag)``. The
+    ETag is a hash of the JSON, so it only changes when a deploy changes the
+    spec. Responses are gzip-compressed when the client accepts it, carry a
+    content-hash ETag per encoding and ``Cache-Control: public, max-age``,
+    and a matching ``If-None-Match`` gets ``304 Not Modified``.
+    """
+    @lru_cache(maxsize=None)
+    def serialized():
+        body = json.dumps(build_spec(), sort_keys=True, separators=(',', ':')).encode()
+        return body, gzip.compress(body, mtime=0), hashlib.sha256(body).hexdigest()[:32]
+
+    def spec_response():
+        body, gzipped, etag = serialized()
+        if request.accept_encodings['gzip']:
+            body, etag = gzipped, f"{etag}-gzip"
+
+        response = current_app.response_class(mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = SWAGGER_CACHE_MAX_AGE
+        response.vary.add('Accept-Encoding')
+
+        if request.if_none_match.contains_weak(etag):
+            response.status_code = 304
+            return response
+
+        response.set_data(body)
+        if etag.endswith('-gzip'):
+            response.content_encoding = 'gzip'
+        return response
+
+    spec_response.serialized = serialized
+    return spec_response
@@ -0,0 +1,45 @@
+"""
+Per-table change counters (``table_versions``) for cheap list validators
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def track_table_version(session, model, table, name):
+    """Bump ``name`` in ``table`` whenever a flush of ``session`` writes ``model`` rows.
+
+    Every app that writes the tracked table must register this (the User
+    Service and the monolith both write ``users``), or list validators go
+    stale after its writes.
+    """
+    @event.listens_for(session, 'after_flush')
+    def bump_on_flush(session, flush_context):
+        dirty = [instance for instance in session.dirty if session.is_modified(instance)]
+        if any(isinstance(instance, model) for instance in (*session.new, *session.deleted, *dirty)):
+            bump_table_version(session.connection(), table, name)
+
+    return bump_on_flush
+
+
+def bump_table_version(connection, table, name):
+    """Increment ``name``'s version, creating the row if needed, in one statement"""
+    dialect_insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+    now = datetime.utcnow()
+    statement = dialect_insert(table).values(name=name, version=1, updated_at=now)
+    # An upsert, so concurrent first writes cannot collide on the primary key
+    statement = statement.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': table.c.version + 1, 'updated_at': statement.excluded.updated_at}
+    )
+    connection.execute(statement)
+
+
+def table_version(session, table, name):
+    """``(version, updated_at)`` of ``name``, or ``(0, None)`` before its first write"""
+    row = session.execute(
+        select(table.c.version, table.c.updated_at).where(table.c.name == name)
+    ).first()
+    return tuple(row) if row is not None else (0, None)
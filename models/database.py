@@ -4,6 +4,9 @@ from sqlalchemy import text
 from datetime import datetime
 import time
 
+from middleware.request_timing import init_request_timing
+from middleware.table_versions import track_table_version
+
 # Initialize SQLAlchemy instance
 db = SQLAlchemy()
 migrate = Migrate()
@@ -11,6 +14,10 @@ migrate = Migrate()
 class User(db.Model):
     """User model for storing user information and roles"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Users by role (GET /api/users/by-role/<role>, /api/users/instructors)
+        db.Index('ix_users_role', 'role'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(255), unique=True, nullable=False)
@@ -31,14 +38,33 @@ class User(db.Model):
             'email': self.email,
             'name': self.name,
             'role': self.role,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
+class TableVersion(db.Model):
+    """Change counter per table (owned by the User Service's migrations).
+    
+    The User Service answers ``GET /api/users`` revalidations from the
+    ``users`` row, so writes to users made here must bump it too.
+    """
+    __tablename__ = 'table_versions'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<TableVersion {self.name} {self.version}>'
+
+track_table_version(db.session, User, TableVersion.__table__, 'users')
+
 def init_db(app):
     """Initialize database with Flask app"""
     db.init_app(app)
     migrate.init_app(app, db)
+    # Per-request query count/DB time (Server-Timing), slow-query log and N+1 warnings
+    init_request_timing(app)
     
     # Wait for database to be ready
     max_retries = 10
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, session
 from middleware.rbac import require_auth, require_role, require_roles, get_current_user
+from middleware.response_cache import analytics_cache
 
 courses_bp = Blueprint('courses', __name__)
 
@@ -94,10 +95,21 @@ def admin_analytics():
     """Get admin analytics (admins only)"""
     current_user = get_current_user()
     
+    cached, age, cache_state = analytics_cache.get('admin_analytics', course_category_counts)
+    analytics_data = dict(cached)
+    analytics_data['accessed_by'] = current_user.to_dict()
+    
+    response = jsonify(analytics_data)
+    response.headers['Age'] = str(int(age))
+    response.headers['X-Cache'] = cache_state.upper()
+    return response
+
+
+def course_category_counts():
+    """Course totals shared by every admin (cached; the caller adds per-user fields)"""
     analytics_data = {
         'total_courses': len(sample_courses),
-        'course_categories': {},
-        'accessed_by': current_user.to_dict()
+        'course_categories': {}
     }
     
     # Count courses by category
@@ -105,4 +117,4 @@ def admin_analytics():
         category = course['category']
         analytics_data['course_categories'][category] = analytics_data['course_categories'].get(category, 0) + 1
     
-    return jsonify(analytics_data)
\ No newline at end of file
+    return analytics_data
@@ -0,0 +1,381 @@
+"""
+Catalog and enrollment aggregates for the analytics endpoint
+"""
+
+import os
+import sys
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import case, delete, event, func, insert, select, text
+
+from services.course_service.models.database import (
+    db, Course, CourseAnalyticsDelta, CourseAnalyticsFoldState, CourseAnalyticsRollup, Enrollment,
+    dialect_insert
+)
+
+# Enrollment statuses, in the order declared on the model
+ENROLLMENT_STATUSES = tuple(Enrollment.__table__.c.completion_status.type.enums)
+
+# Additive columns of the rollup table
+ROLLUP_COUNTERS = ('courses', 'rating_sum', 'rated', 'enrollments') + ENROLLMENT_STATUSES
+
+
+def category_key(category):
+    """Rollup/analytics key for a course category"""
+    return category or 'uncategorized'
+
+
+def category_aggregates():
+    """Aggregate courses and enrollments per category with a single grouped query.
+
+    Enrollments are first counted per course and status, then joined to
+    courses and grouped by category, so the database returns one row of
+    scalars per category: memory and transfer are O(categories) rather than
+    O(courses).
+    """
+    per_course = (
+        select(
+            Enrollment.course_id,
+            func.count().label('total'),
+            *[func.count().filter(Enrollment.completion_status == status).label(status)
+              for status in ENROLLMENT_STATUSES]
+        )
+        .group_by(Enrollment.course_id)
+        .subquery()
+    )
+
+    category = func.coalesce(Course.category, 'uncategorized')
+    rows = db.session.execute(
+        select(
+            category.label('category'),
+            func.count(Course.id).label('courses'),
+            func.coalesce(func.sum(Course.rating), 0.0).label('rating_sum'),
+            func.count(Course.rating).label('rated'),
+            func.coalesce(func.sum(per_course.c.total), 0).label('enrollments'),
+            *[func.coalesce(func.sum(per_course.c[status]), 0).label(status) for status in ENROLLMENT_STATUSES]
+        )
+        .select_from(Course)
+        .outerjoin(per_course, per_course.c.course_id == Course.id)
+        .group_by(category)
+    ).all()
+
+    return [row._asdict() for row in rows]
+
+
+def course_analytics():
+    """Analytics payload read from the rollup table plus not-yet-folded deltas.
+
+    Costs O(categories + pending deltas) no matter how many courses and
+    enrollments exist, and is exact: deltas are added until they are folded
+    in. ``rollup_updated_at`` reports when the numbers last changed. An empty
+    rollup (a new database) falls back to the live aggregate query.
+    """
+    rollups = CourseAnalyticsRollup.query.all()
+    totals = {
+        rollup.category: {counter: getattr(rollup, counter) for counter in ROLLUP_COUNTERS}
+        for rollup in rollups
+    }
+    updated = [rollup.updated_at for rollup in rollups]
+
+    delta = CourseAnalyticsDelta.__table__
+    pending = db.session.execute(
+        select(
+            delta.c.category, func.count().label('rows'), func.max(delta.c.created_at).label('created_at'),
+            *[func.sum(delta.c[counter]).label(counter) for counter in ROLLUP_COUNTERS]
+        ).group_by(delta.c.category)
+    ).all()
+    for row in pending:
+        category = totals.setdefault(row.category, dict.fromkeys(ROLLUP_COUNTERS, 0))
+        for counter in ROLLUP_COUNTERS:
+            category[counter] += row._mapping[counter]
+        updated.append(row.created_at)
+
+    rows = [
+        {'category': category, **counters}
+        for category, counters in totals.items()
+        if counters['courses'] or counters['enrollments']
+    ]
+    if not rows:
+        # Nothing counted (yet): cheap to aggregate live, and right after direct inserts
+        analytics = summarize(category_aggregates())
+        analytics['source'] = 'live'
+        analytics['rollup_updated_at'] = None
+        analytics['rollup_pending_deltas'] = 0
+        return analytics
+
+    analytics = summarize(rows)
+    analytics['source'] = 'rollup'
+    analytics['rollup_updated_at'] = max(updated).isoformat()
+    analytics['rollup_pending_deltas'] = sum(row.rows for row in pending)
+    return analytics
+
+
+def summarize(category_rows):
+    """Turn per-category aggregate rows into the analytics payload"""
+    categories = {}
+    by_status = dict.fromkeys(ENROLLMENT_STATUSES, 0)
+    rating_sum = 0.0
+    rated = 0
+
+    for row in category_rows:
+        categories[row['category']] = {
+            'courses': row['courses'],
+            'enrollments': int(row['enrollments']),
+            'average_rating': round(row['rating_sum'] / row['rated'], 2) if row['rated'] else 0
+        }
+        for status in ENROLLMENT_STATUSES:
+            by_status[status] += int(row[status])
+        rating_sum += row['rating_sum']
+        rated += row['rated']
+
+    return {
+        'total_courses': sum(category['courses'] for category in categories.values()),
+        'total_enrollments': sum(category['enrollments'] for category in categories.values()),
+        'course_categories': {name: category['courses'] for name, category in categories.items()},
+        'category_stats': categories,
+        'enrollments_by_status': by_status,
+        'average_rating': round(rating_sum / rated, 2) if rated else 0
+    }
+
+
+def enrollment_counts(course_id):
+    """``{status: count}`` of a course's enrollments, plus ``'enrollments'`` for the total"""
+    rows = db.session.execute(
+        select(Enrollment.completion_status, func.count())
+        .where(Enrollment.course_id == course_id)
+        .group_by(Enrollment.completion_status)
+    ).all()
+
+    counts = {status: count for status, count in rows if status in ENROLLMENT_STATUSES}
+    counts['enrollments'] = sum(count for _, count in rows)
+    return counts
+
+
+class RollupDelta:
+    """Changes to the analytics rollup collected during one write transaction.
+
+    Call ``apply()`` before committing: it appends one
+    ``course_analytics_deltas`` row per changed category, so the change
+    commits atomically with the courses and enrollments it describes. Rows
+    are only ever inserted, so concurrent writers (in any category) never
+    wait on each other; ``fold_rollup_deltas()`` moves them into the rollup.
+    """
+
+    def __init__(self):
+        self._deltas = defaultdict(lambda: dict.fromkeys(ROLLUP_COUNTERS, 0))
+
+    def add_course(self, category, rating, sign=1):
+        """Count a course in (sign=1) or out of (sign=-1) its category"""
+        delta = self._deltas[category_key(category)]
+        delta['courses'] += sign
+        if rating is not None:
+            delta['rating_sum'] += sign * rating
+            delta['rated'] += sign
+
+    def add_enrollments(self, category, counts, sign=1):
+        """Count enrollments in or out of a category.
+
+        ``counts`` maps statuses to numbers of enrollments and may carry an
+        ``'enrollments'`` total (defaults to the sum of the statuses).
+        """
+        delta = self._deltas[category_key(category)]
+        for status in ENROLLMENT_STATUSES:
+            delta[status] += sign * counts.get(status, 0)
+        total = counts.get('enrollments', sum(counts.get(status, 0) for status in ENROLLMENT_STATUSES))
+        delta['enrollments'] += sign * total
+
+    def apply(self):
+        """Append the collected changes as delta rows (does not commit)"""
+        changed = sorted(
+            (category, delta) for category, delta in self._deltas.items() if any(delta.values())
+        )
+        self._deltas.clear()
+        if not changed:
+            return
+
+        now = datetime.utcnow()
+        db.session.execute(insert(CourseAnalyticsDelta.__table__), [
+            {'category': category, **delta, 'created_at': now} for category, delta in changed
+        ])
+
+
+@event.listens_for(db.session, 'before_flush')
+def _touch_catalog(session, flush_context, instances):
+    """Append an all-zero delta when a flush changes courses or enrollments.
+
+    Keeps ``course_list_version()`` moving for ORM writes that leave the
+    counters alone (a title edit) or bypass ``RollupDelta`` (seed scripts).
+    Set-based writes run ``RollupDelta.apply()``, which always appends.
+    """
+    dirty = [instance for instance in session.dirty if session.is_modified(instance)]
+    changed = [
+        instance for instance in (*session.new, *session.deleted, *dirty)
+        if isinstance(instance, (Course, Enrollment))
+    ]
+    if changed:
+        category = category_key(getattr(changed[0], 'category', None))
+        session.add(CourseAnalyticsDelta(category=category, created_at=datetime.utcnow()))
+
+
+def fold_rollup_deltas(batch_size=10000):
+    """Fold pending delta rows into the rollup, committing per batch; returns the rows folded.
+
+    Each batch is claimed with ``DELETE ... RETURNING``, so folders running
+    concurrently (one per worker process) never count a delta twice: the
+    second one finds the rows already gone. Only folders contend for the
+    rollup rows.
+    """
+    delta = CourseAnalyticsDelta.__table__
+    folded = 0
+    while True:
+        batch = select(delta.c.id).order_by(delta.c.id).limit(batch_size).scalar_subquery()
+        rows = db.session.execute(
+            delete(delta).where(delta.c.id.in_(batch))
+            .returning(delta.c.category, delta.c.created_at, *[delta.c[counter] for counter in ROLLUP_COUNTERS])
+        ).all()
+        if not rows:
+            db.session.rollback()
+            return folded
+
+        totals = defaultdict(lambda: dict.fromkeys(ROLLUP_COUNTERS, 0))
+        changed_at = {}
+        for row in rows:
+            for counter in ROLLUP_COUNTERS:
+                totals[row.category][counter] += row._mapping[counter]
+            changed_at[row.category] = max(row.created_at, changed_at.get(row.category, row.created_at))
+        _upsert_rollup(totals, changed_at)
+        _count_fold(max(changed_at.values()))
+        db.session.commit()
+
+        folded += len(rows)
+        if len(rows) < batch_size:
+            return folded
+
+
+def _upsert_rollup(totals, changed_at):
+    """Add ``{category: {counter: delta}}`` to the rollup rows, in category order (does not commit)"""
+    table = CourseAnalyticsRollup.__table__
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=['category'],
+        set_={
+            **{counter: table.c[counter] + statement.excluded[counter] for counter in ROLLUP_COUNTERS},
+            'updated_at': statement.excluded.updated_at
+        }
+    )
+    db.session.execute(statement, [
+        {'category': category, **totals[category], 'updated_at': changed_at[category]}
+        for category in sorted(totals)
+    ])
+
+
+def _count_fold(changed_at):
+    """Bump the fold counter and move its ``last_change_at`` up to ``changed_at`` (does not commit)"""
+    table = CourseAnalyticsFoldState.__table__
+    statement = dialect_insert(table).values(id=1, folds=1, last_change_at=changed_at)
+    statement = statement.on_conflict_do_update(
+        index_elements=['id'],
+        set_={
+            'folds': table.c.folds + 1,
+            'last_change_at': case(
+                (table.c.last_change_at > statement.excluded.last_change_at, table.c.last_change_at),
+                else_=statement.excluded.last_change_at
+            )
+        }
+    )
+    db.session.execute(statement)
+
+
+class RollupFolder:
+    """Runs ``fold_rollup_deltas()`` every ``interval`` seconds on a daemon thread.
+
+    The thread starts with the first request, so each worker process forked
+    after ``create_app()`` runs its own; their folds do not conflict.
+    ``interval=0`` disables folding (deltas are still counted by reads).
+    """
+
+    def __init__(self, interval=10.0, batch_size=10000):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._app = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls):
+        """Build a folder configured from ANALYTICS_ROLLUP_FOLD_* environment variables"""
+        return cls(
+            interval=float(os.getenv('ANALYTICS_ROLLUP_FOLD_INTERVAL', 10)),
+            batch_size=int(os.getenv('ANALYTICS_ROLLUP_FOLD_BATCH', 10000))
+        )
+
+    def init_app(self, app):
+        """Fold the rollup of ``app``'s database in the background"""
+        if self.interval <= 0:
+            return self
+        self._app = app
+        app.before_request(self._ensure_started)
+        return self
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='analytics-rollup-folder', daemon=True)
+                self._thread.start()
+
+    def close(self, timeout=2.0):
+        """Stop the folding thread"""
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._fold()
+            except Exception as e:
+                # Never let the thread die: unfolded deltas would slow every analytics and list read
+                print(f"Analytics rollup fold failed, will retry: {e!r}", file=sys.stderr)
+
+    def _fold(self):
+        with self._app.app_context():
+            try:
+                fold_rollup_deltas(self.batch_size)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+
+def rebuild_rollup():
+    """Recompute the whole rollup from courses and enrollments and commit it.
+
+    Pending deltas are discarded, since the recompute already includes them.
+    For repair after writes that bypassed the service (manual SQL, restores).
+    On PostgreSQL the deltas table is locked against writers first (reads
+    continue): otherwise a write committing between the aggregate and the
+    delete would lose its delta. Writers wait for the rebuild to commit.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text(f'LOCK TABLE {CourseAnalyticsDelta.__tablename__} IN EXCLUSIVE MODE'))
+    rows = category_aggregates()
+    now = datetime.utcnow()
+
+    db.session.execute(CourseAnalyticsDelta.__table__.delete())
+    db.session.execute(CourseAnalyticsRollup.__table__.delete())
+    if rows:
+        db.session.execute(insert(CourseAnalyticsRollup.__table__), [
+            {'category': row['category'], **{counter: row[counter] for counter in ROLLUP_COUNTERS}, 'updated_at': now}
+            for row in rows
+        ])
+    _count_fold(now)
+    db.session.commit()
+    return len(rows)
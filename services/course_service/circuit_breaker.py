@@ -0,0 +1,137 @@
+"""
+Circuit breaker guarding Course Service calls to the User Service
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Error-rate / slow-call-rate circuit breaker.
+
+    While CLOSED, outcomes of the last ``window_size`` calls are kept; once at
+    least ``min_calls`` are recorded the circuit OPENs if the failure rate or
+    the rate of calls slower than ``slow_call_seconds`` reaches its threshold.
+    While OPEN every call is rejected immediately. After ``open_seconds`` the
+    circuit goes HALF_OPEN and lets ``half_open_calls`` probes through: if
+    they all succeed it CLOSEs again, any failure re-OPENs it.
+    """
+
+    def __init__(self, failure_rate_threshold=0.5, slow_call_seconds=1.0, slow_call_rate_threshold=0.8,
+                 window_size=20, min_calls=10, open_seconds=10.0, half_open_calls=3, clock=time.monotonic):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)  # (failed, slow) per call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self._rejected = 0
+        self._transitions = {}
+
+    @classmethod
+    def from_env(cls):
+        """Build a breaker configured from USER_SERVICE_BREAKER_* environment variables"""
+        return cls(
+            failure_rate_threshold=float(os.getenv('USER_SERVICE_BREAKER_FAILURE_RATE', 0.5)),
+            slow_call_seconds=float(os.getenv('USER_SERVICE_BREAKER_SLOW_CALL_SECONDS', 1.0)),
+            slow_call_rate_threshold=float(os.getenv('USER_SERVICE_BREAKER_SLOW_CALL_RATE', 0.8)),
+            window_size=int(os.getenv('USER_SERVICE_BREAKER_WINDOW', 20)),
+            min_calls=int(os.getenv('USER_SERVICE_BREAKER_MIN_CALLS', 10)),
+            open_seconds=float(os.getenv('USER_SERVICE_BREAKER_OPEN_SECONDS', 10)),
+            half_open_calls=int(os.getenv('USER_SERVICE_BREAKER_HALF_OPEN_CALLS', 3))
+        )
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow_request(self):
+        """Return True if a call may proceed; counts a rejection otherwise"""
+        with self._lock:
+            self._maybe_half_open()
+
+            if self._state == CLOSED:
+                return True
+
+            if self._state == HALF_OPEN and self._probes_started < self.half_open_calls:
+                self._probes_started += 1
+                return True
+
+            self._rejected += 1
+            return False
+
+    def record(self, failed, seconds=0.0):
+        """Record the outcome of a call that was allowed through"""
+        slow = seconds >= self.slow_call_seconds
+
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(OPEN)
+                else:
+                    self._probes_succeeded += 1
+                    if self._probes_succeeded >= self.half_open_calls:
+                        self._transition(CLOSED)
+                return
+
+            if self._state == OPEN:
+                return
+
+            self._window.append((failed, slow))
+            if len(self._window) < self.min_calls:
+                return
+
+            failures = sum(1 for call_failed, _ in self._window if call_failed)
+            slow_calls = sum(1 for _, call_slow in self._window if call_slow)
+            if (failures / len(self._window) >= self.failure_rate_threshold
+                    or slow_calls / len(self._window) >= self.slow_call_rate_threshold):
+                self._transition(OPEN)
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, new_state):
+        key = f"{self._state}->{new_state}"
+        self._transitions[key] = self._transitions.get(key, 0) + 1
+        self._state = new_state
+        self._window.clear()
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        if new_state == OPEN:
+            self._opened_at = self._clock()
+
+    def stats(self):
+        """Current state, transition counts and rejected-call count"""
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                'state': self._state,
+                'rejected_calls': self._rejected,
+                'transitions': dict(self._transitions),
+                'failure_rate_threshold': self.failure_rate_threshold,
+                'slow_call_seconds': self.slow_call_seconds,
+                'slow_call_rate_threshold': self.slow_call_rate_threshold,
+                'open_seconds': self.open_seconds
+            }
@@ -0,0 +1,74 @@
+"""
+ETag / Last-Modified validators and conditional GET handling for read endpoints
+"""
+
+import hashlib
+from datetime import timezone
+
+from flask import current_app, request
+from sqlalchemy import func, select
+
+from services.course_service.models.database import db, CourseAnalyticsDelta, CourseAnalyticsFoldState
+
+
+def make_etag(*parts):
+    """Strong ETag value (unquoted) for a representation identified by ``parts``.
+
+    The request URL is always included, since host, path and query all shape
+    the representation (HATEOAS links, page, filters).
+    """
+    digest = hashlib.sha1(repr((request.url,) + parts).encode())
+    return digest.hexdigest()
+
+
+def course_list_version():
+    """``((folds, pending_deltas), last_modified)`` of the course catalog.
+
+    Every course and enrollment write appends an analytics delta, and deltas
+    are only deleted by folds, which bump ``folds`` in the same transaction;
+    so the pair changes with every committed write. One query that never
+    reads ``courses``: it costs O(deltas pending since the last fold), not
+    O(catalog).
+    """
+    state = CourseAnalyticsFoldState.__table__
+    delta = CourseAnalyticsDelta.__table__
+    folds, folded_at, pending, pending_at = db.session.execute(select(
+        select(state.c.folds).where(state.c.id == 1).scalar_subquery(),
+        select(state.c.last_change_at).where(state.c.id == 1).scalar_subquery(),
+        select(func.count()).select_from(delta).scalar_subquery(),
+        select(func.max(delta.c.created_at)).scalar_subquery()
+    )).one()
+    return (folds or 0, pending), max(filter(None, (folded_at, pending_at)), default=None)
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response if the request's validators still match, otherwise None.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since``, as in
+    RFC 9110; the latter compares at whole-second precision.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = _http_time(last_modified) <= request.if_modified_since
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified=None):
+    """Set ``ETag``, ``Last-Modified`` and ``Cache-Control: no-cache`` on ``response``"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_time(last_modified)
+    # Caches may store the response but must revalidate before reusing it
+    response.cache_control.no_cache = True
+    return response
+
+
+def _http_time(value):
+    """Stored UTC timestamps as aware datetimes truncated to HTTP-date precision"""
+    return value.replace(microsecond=0, tzinfo=timezone.utc)
@@ -0,0 +1,161 @@
+"""
+Atomic enrollment writes backed by the ``courses.enrolled_count`` seat counter
+"""
+
+from collections import Counter
+
+from sqlalchemy import case, or_, update
+
+from services.course_service.analytics import RollupDelta
+from services.course_service.models.database import db, Course, Enrollment, dialect_insert
+
+# Enrollment outcomes
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already_enrolled'
+COURSE_FULL = 'course_full'
+COURSE_NOT_FOUND = 'course_not_found'
+
+
+def has_seats(seats=1):
+    """WHERE clause for courses with at least ``seats`` free places (no limit when max_students is NULL)"""
+    return or_(Course.max_students.is_(None), Course.enrolled_count + seats <= Course.max_students)
+
+
+def insert_enrollments():
+    """INSERT for enrollment rows that skips (student_id, course_id) pairs that already exist.
+
+    Execute it with a list of rows: SQLAlchemy compiles it once and sends the
+    rows as batched multi-row VALUES, RETURNING only the rows inserted.
+    """
+    return (dialect_insert(Enrollment.__table__)
+            .on_conflict_do_nothing(index_elements=['student_id', 'course_id'])
+            .returning(*Enrollment.__table__.c))
+
+
+def enroll_student(course_id, student_id):
+    """Enroll one student, returning ``(outcome, enrollment)``.
+
+    The seat is claimed with a conditional ``UPDATE ... WHERE enrolled_count <
+    max_students RETURNING`` and the row written with ``INSERT ... ON CONFLICT
+    DO NOTHING``, both in one transaction. The UPDATE locks the course row, so
+    concurrent enrollments cannot oversubscribe it, and no enrollment rows are
+    counted. ``enrollment`` is None unless the outcome is ENROLLED.
+    """
+    claimed = db.session.execute(
+        update(Course)
+        .where(Course.id == course_id, has_seats())
+        .values(enrolled_count=Course.enrolled_count + 1)
+        .returning(Course.id, Course.category)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if claimed is None:
+        db.session.rollback()
+        return _rejection(course_id, student_id), None
+
+    row = db.session.execute(insert_enrollments(), [{'student_id': student_id, 'course_id': course_id}]).first()
+    if row is None:
+        # Already enrolled: give the seat back
+        db.session.rollback()
+        return ALREADY_ENROLLED, None
+
+    rollup = RollupDelta()
+    rollup.add_enrollments(claimed.category, {row.completion_status: 1})
+    rollup.apply()
+
+    db.session.commit()
+    return ENROLLED, Enrollment(**row._mapping)
+
+
+def _rejection(course_id, student_id):
+    """Work out why a seat could not be claimed (only runs on the failure path)"""
+    if db.session.get(Course, course_id) is None:
+        return COURSE_NOT_FOUND
+
+    existing = db.session.query(Enrollment.id).filter_by(student_id=student_id, course_id=course_id).first()
+    return ALREADY_ENROLLED if existing else COURSE_FULL
+
+
+def enroll_students(course_ids, student_ids):
+    """Enroll every student in every course with set-based SQL.
+
+    The courses are locked and read with one ``SELECT ... FOR UPDATE``,
+    existing enrollments for all pairs are found with one query, and the
+    accepted pairs are written with a single multi-row ``INSERT ... ON
+    CONFLICT DO NOTHING`` followed by one ``UPDATE`` of the seat counters
+    (and one insert of analytics delta rows).
+    When a course has fewer free seats than students, students are admitted
+    in the order given. Returns one ``{'student_id', 'course_id', 'status',
+    'enrollment_id'}`` entry per distinct pair, in request order.
+    """
+    course_ids = list(dict.fromkeys(course_ids))
+    student_ids = list(dict.fromkeys(student_ids))
+
+    courses = {
+        course.id: course
+        for course in db.session.query(Course.id, Course.category, Course.max_students, Course.enrolled_count)
+        .filter(Course.id.in_(course_ids))
+        .order_by(Course.id)  # consistent lock order, so concurrent bulk requests cannot deadlock
+        .with_for_update()
+    }
+    existing = set()
+    if courses:
+        existing = set(
+            db.session.query(Enrollment.student_id, Enrollment.course_id)
+            .filter(Enrollment.course_id.in_(list(courses)), Enrollment.student_id.in_(student_ids))
+        )
+
+    outcomes = {}
+    accepted = []
+    for course_id in course_ids:
+        course = courses.get(course_id)
+        free = None
+        if course is not None and course.max_students is not None:
+            free = max(0, course.max_students - course.enrolled_count)
+
+        for student_id in student_ids:
+            pair = (student_id, course_id)
+            if course is None:
+                outcomes[pair] = COURSE_NOT_FOUND
+            elif pair in existing:
+                outcomes[pair] = ALREADY_ENROLLED
+            elif free == 0:
+                outcomes[pair] = COURSE_FULL
+            else:
+                outcomes[pair] = ENROLLED
+                accepted.append({'student_id': student_id, 'course_id': course_id})
+                if free is not None:
+                    free -= 1
+
+    inserted = {}
+    if accepted:
+        rows = db.session.execute(insert_enrollments(), accepted).all()
+        inserted = {(row.student_id, row.course_id): row.id for row in rows}
+
+        rollup = RollupDelta()
+        for row in rows:
+            rollup.add_enrollments(courses[row.course_id].category, {row.completion_status: 1})
+        rollup.apply()
+
+        seats = Counter(course_id for _, course_id in inserted)
+        if seats:
+            db.session.execute(
+                update(Course)
+                .where(Course.id.in_(list(seats)))
+                .values(enrolled_count=Course.enrolled_count + case(dict(seats), value=Course.id, else_=0))
+                .execution_options(synchronize_session=False)
+            )
+    db.session.commit()
+
+    results = []
+    for (student_id, course_id), outcome in outcomes.items():
+        if outcome == ENROLLED and (student_id, course_id) not in inserted:
+            # Lost a race with a concurrent insert of the same pair
+            outcome = ALREADY_ENROLLED
+        results.append({
+            'student_id': student_id,
+            'course_id': course_id,
+            'status': outcome,
+            'enrollment_id': inserted.get((student_id, course_id))
+        })
+    return results
@@ -0,0 +1,139 @@
+"""
+Process-local cache for instructor records fetched from the User Service
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class InstructorCache:
+    """Bounded LRU cache with per-entry TTL and negative caching.
+
+    Positive entries hold the user dictionary returned by the User Service.
+    Negative entries (``None``) record instructors the User Service reported
+    as missing, so unknown IDs are not re-fetched on every read; they use a
+    shorter TTL so newly created users become visible quickly.
+
+    Expired positive entries stay in the cache (until evicted, invalidated or
+    refreshed) so ``lookup_stale`` can serve last-known data while the User
+    Service is unavailable.
+    """
+
+    def __init__(self, max_size=1024, ttl=300.0, negative_ttl=30.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # instructor_id -> (expires_at, user or None)
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'expirations': 0,
+            'stale_hits': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache configured from INSTRUCTOR_CACHE_* environment variables"""
+        return cls(
+            max_size=int(os.getenv('INSTRUCTOR_CACHE_SIZE', 1024)),
+            ttl=float(os.getenv('INSTRUCTOR_CACHE_TTL', 300)),
+            negative_ttl=float(os.getenv('INSTRUCTOR_CACHE_NEGATIVE_TTL', 30))
+        )
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def lookup(self, instructor_id):
+        """Return ``(hit, user)``; ``user`` is None for a cached 404"""
+        if not self.enabled:
+            return False, None
+
+        with self._lock:
+            entry = self._entries.get(instructor_id)
+            if entry is None:
+                self._counters['misses'] += 1
+                return False, None
+
+            expires_at, user = entry
+            if expires_at <= self._clock():
+                if user is None:
+                    del self._entries[instructor_id]
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return False, None
+
+            self._entries.move_to_end(instructor_id)
+            self._counters['hits' if user is not None else 'negative_hits'] += 1
+            return True, user
+
+    def lookup_stale(self, instructor_id):
+        """Return the last known record for an instructor, even if expired"""
+        with self._lock:
+            entry = self._entries.get(instructor_id)
+            if entry is None or entry[1] is None:
+                return None
+
+            self._counters['stale_hits'] += 1
+            return entry[1]
+
+    def store(self, instructor_id, user):
+        """Cache an instructor record"""
+        self._put(instructor_id, user, self.ttl)
+
+    def store_missing(self, instructor_id):
+        """Remember that the User Service does not know this instructor"""
+        self._put(instructor_id, None, self.negative_ttl)
+
+    def _put(self, instructor_id, user, ttl):
+        if not self.enabled or ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[instructor_id] = (self._clock() + ttl, user)
+            self._entries.move_to_end(instructor_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def invalidate(self, instructor_ids):
+        """Drop specific instructors; returns how many entries were removed"""
+        removed = 0
+        with self._lock:
+            for instructor_id in instructor_ids:
+                if self._entries.pop(instructor_id, None) is not None:
+                    removed += 1
+            self._counters['invalidations'] += removed
+        return removed
+
+    def clear(self):
+        """Drop every entry; returns how many entries were removed"""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._counters['invalidations'] += removed
+        return removed
+
+    def stats(self):
+        """Snapshot of cache configuration and hit/miss/eviction counters"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._entries)
+
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['negative_hits']) / lookups, 4) if lookups else 0.0
+        stats['max_size'] = self.max_size
+        stats['ttl_seconds'] = self.ttl
+        stats['negative_ttl_seconds'] = self.negative_ttl
+        return stats
+
+
+# Shared cache used by the course routes
+instructor_cache = InstructorCache.from_env()
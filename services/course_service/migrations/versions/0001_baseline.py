@@ -0,0 +1,63 @@
+"""Baseline: courses and enrollments tables
+
+Revision ID: 0001_baseline
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+Tables were historically created by ``db.create_all()`` in ``init_db``, so
+they are only created here when missing. Existing databases can simply be
+upgraded; this revision is a no-op for them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def has_table(name):
+    if op.get_context().as_sql:
+        # Offline (--sql) mode cannot inspect the database: emit the full DDL
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not has_table('courses'):
+        op.create_table(
+            'courses',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('instructor_id', sa.Integer(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=True),
+            sa.Column('rating', sa.Float(), nullable=True),
+            sa.Column('max_students', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if not has_table('enrollments'):
+        op.create_table(
+            'enrollments',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('student_id', sa.Integer(), nullable=False),
+            sa.Column('course_id', sa.Integer(), nullable=False),
+            sa.Column('enrollment_date', sa.DateTime(), nullable=True),
+            sa.Column('completion_status',
+                      sa.Enum('enrolled', 'in_progress', 'completed', 'dropped', name='enrollment_status'),
+                      nullable=True),
+            sa.ForeignKeyConstraint(['course_id'], ['courses.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('enrollments')
+    op.drop_table('courses')
+    sa.Enum(name='enrollment_status').drop(op.get_bind(), checkfirst=True)
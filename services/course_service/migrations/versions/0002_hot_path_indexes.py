@@ -0,0 +1,68 @@
+"""Hot-path indexes for course listings and enrollments
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17 09:10:00.000000
+
+Indexes are built with CREATE INDEX CONCURRENTLY (outside a transaction) so
+this can be applied to a live database without blocking writes. If a build
+fails, PostgreSQL leaves an INVALID index behind: drop it and upgrade again.
+
+Duplicate enrollments (same student and course) must be removed before the
+unique index can be built: all but the oldest row of each pair are deleted,
+and the count and (student_id, course_id) pairs are logged.
+"""
+import logging
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_hot_path_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# (name, table, columns, unique)
+INDEXES = [
+    ('ix_courses_category_id', 'courses', ['category', 'id'], False),
+    ('ix_courses_category_title_id', 'courses', ['category', 'title', 'id'], False),
+    ('ix_courses_category_rating_id', 'courses', ['category', 'rating', 'id'], False),
+    ('ix_courses_title_id', 'courses', ['title', 'id'], False),
+    ('ix_courses_rating_id', 'courses', ['rating', 'id'], False),
+    ('ix_courses_instructor_id', 'courses', ['instructor_id'], False),
+    ('uq_enrollments_student_course', 'enrollments', ['student_id', 'course_id'], True),
+    ('ix_enrollments_course_status', 'enrollments', ['course_id', 'completion_status'], False),
+]
+
+
+def upgrade():
+    # The unique index cannot be built while duplicate enrollments exist; keep the oldest
+    delete_duplicates = (
+        "DELETE FROM enrollments WHERE id NOT IN ("
+        "SELECT MIN(id) FROM enrollments GROUP BY student_id, course_id)"
+    )
+    if context.is_offline_mode():
+        op.execute(delete_duplicates)
+    else:
+        removed = op.get_bind().execute(
+            sa.text(delete_duplicates + " RETURNING student_id, course_id")
+        ).all()
+        if removed:
+            pairs = sorted({(row.student_id, row.course_id) for row in removed})
+            logger.warning("Deleted %d duplicate enrollment(s) for (student_id, course_id) %s",
+                           len(removed), pairs)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
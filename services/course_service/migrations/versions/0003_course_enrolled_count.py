@@ -0,0 +1,41 @@
+"""Denormalized enrolled_count seat counter on courses
+
+Revision ID: 0003_course_enrolled_count
+Revises: 0002_hot_path_indexes
+Create Date: 2026-10-17 10:00:00.000000
+
+Enrollment capacity checks use ``courses.enrolled_count`` instead of counting
+enrollment rows. The column is backfilled from the existing enrollments.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_course_enrolled_count'
+down_revision = '0002_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def has_column(table, column):
+    if op.get_context().as_sql:
+        # Offline (--sql) mode cannot inspect the database: emit the full DDL
+        return False
+    return any(c['name'] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def upgrade():
+    if not has_column('courses', 'enrolled_count'):
+        op.add_column('courses', sa.Column('enrolled_count', sa.Integer(), nullable=False,
+                                           server_default='0'))
+
+    op.execute(
+        "UPDATE courses SET enrolled_count = ("
+        "SELECT COUNT(*) FROM enrollments WHERE enrollments.course_id = courses.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('courses') as batch_op:
+        batch_op.drop_column('enrolled_count')
@@ -0,0 +1,65 @@
+"""Analytics rollup table
+
+Revision ID: 0004_course_analytics_rollup
+Revises: 0003_course_enrolled_count
+Create Date: 2026-10-17 11:00:00.000000
+
+Per-category aggregates read by /api/analytics, maintained incrementally by
+the course and enrollment writes. The table is (re)filled from the current
+courses and enrollments, which also repairs a rollup that was created by
+``db.create_all()`` before this revision ran.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_course_analytics_rollup'
+down_revision = '0003_course_enrolled_count'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('enrolled', 'in_progress', 'completed', 'dropped')
+
+
+def has_table(name):
+    if op.get_context().as_sql:
+        # Offline (--sql) mode cannot inspect the database: emit the full DDL
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not has_table('course_analytics_rollup'):
+        op.create_table(
+            'course_analytics_rollup',
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('courses', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('rating_sum', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('rated', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('enrollments', sa.Integer(), nullable=False, server_default='0'),
+            *[sa.Column(status, sa.Integer(), nullable=False, server_default='0') for status in STATUSES],
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('category')
+        )
+
+    status_counts = ', '.join(
+        f"SUM(CASE WHEN completion_status = '{status}' THEN 1 ELSE 0 END) AS {status}" for status in STATUSES
+    )
+    status_sums = ', '.join(f"COALESCE(SUM(e.{status}), 0)" for status in STATUSES)
+
+    op.execute("DELETE FROM course_analytics_rollup")
+    op.execute(
+        f"INSERT INTO course_analytics_rollup "
+        f"(category, courses, rating_sum, rated, enrollments, {', '.join(STATUSES)}, updated_at) "
+        f"SELECT COALESCE(c.category, 'uncategorized'), COUNT(c.id), COALESCE(SUM(c.rating), 0), COUNT(c.rating), "
+        f"COALESCE(SUM(e.total), 0), {status_sums}, CURRENT_TIMESTAMP "
+        f"FROM courses c LEFT JOIN ("
+        f"SELECT course_id, COUNT(*) AS total, {status_counts} FROM enrollments GROUP BY course_id"
+        f") e ON e.course_id = c.id "
+        f"GROUP BY COALESCE(c.category, 'uncategorized')"
+    )
+
+
+def downgrade():
+    op.drop_table('course_analytics_rollup')
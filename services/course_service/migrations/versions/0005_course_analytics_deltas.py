@@ -0,0 +1,49 @@
+"""Append-only analytics delta rows
+
+Revision ID: 0005_course_analytics_deltas
+Revises: 0004_course_analytics_rollup
+Create Date: 2026-10-17 16:00:00.000000
+
+Course and enrollment writes append their analytics changes here instead of
+upserting the per-category rollup row, which serialized every write in a
+category. Pending rows are folded into ``course_analytics_rollup`` by a
+periodic job and deleted.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_course_analytics_deltas'
+down_revision = '0004_course_analytics_rollup'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('enrolled', 'in_progress', 'completed', 'dropped')
+
+
+def has_table(name):
+    if op.get_context().as_sql:
+        # Offline (--sql) mode cannot inspect the database: emit the full DDL
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not has_table('course_analytics_deltas'):
+        op.create_table(
+            'course_analytics_deltas',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('courses', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('rating_sum', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('rated', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('enrollments', sa.Integer(), nullable=False, server_default='0'),
+            *[sa.Column(status, sa.Integer(), nullable=False, server_default='0') for status in STATUSES],
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('course_analytics_deltas')
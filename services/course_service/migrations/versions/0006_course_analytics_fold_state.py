@@ -0,0 +1,42 @@
+"""Rollup fold counter for course list validators
+
+Revision ID: 0006_course_analytics_fold_state
+Revises: 0005_course_analytics_deltas
+Create Date: 2026-10-17 18:00:00.000000
+
+Course list ETags were derived from ``COUNT``/``MAX(updated_at)`` over the
+whole courses table on every list request. Every catalog write now appends an
+analytics delta and every fold bumps this row, so the validator reads one row
+plus the pending deltas instead.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_course_analytics_fold_state'
+down_revision = '0005_course_analytics_deltas'
+branch_labels = None
+depends_on = None
+
+
+def has_table(name):
+    if op.get_context().as_sql:
+        # Offline (--sql) mode cannot inspect the database: emit the full DDL
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not has_table('course_analytics_fold_state'):
+        op.create_table(
+            'course_analytics_fold_state',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('folds', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('last_change_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('course_analytics_fold_state')
@@ -1,16 +1,30 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
 import time
 
+from middleware.request_timing import init_request_timing
+
 # Initialize SQLAlchemy instance
 db = SQLAlchemy()
-migrate = Migrate()
+# Both services share one database, so each keeps its own Alembic version table
+migrate = Migrate(version_table='alembic_version_course_service')
 
 class Course(db.Model):
     """Course model for storing course information"""
     __tablename__ = 'courses'
+    # Indexes match the listing query shapes: optional category filter, then
+    # ORDER BY <sort column>, id (see services/course_service/pagination.py)
+    __table_args__ = (
+        db.Index('ix_courses_category_id', 'category', 'id'),
+        db.Index('ix_courses_category_title_id', 'category', 'title', 'id'),
+        db.Index('ix_courses_category_rating_id', 'category', 'rating', 'id'),
+        db.Index('ix_courses_title_id', 'title', 'id'),
+        db.Index('ix_courses_rating_id', 'rating', 'id'),
+        db.Index('ix_courses_instructor_id', 'instructor_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -19,29 +33,37 @@ class Course(db.Model):
     category = db.Column(db.String(100), default='general')
     rating = db.Column(db.Float, default=0.0)
     max_students = db.Column(db.Integer, default=50)
+    # Seats taken; maintained by services/course_service/enrollment.py in the same
+    # transaction as the enrollment rows, so capacity checks never count rows
+    enrolled_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<Course {self.title}>'
     
-    def to_dict(self):
-        """Convert course object to dictionary"""
-        return {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'instructor_id': self.instructor_id,
-            'category': self.category,
-            'rating': self.rating,
-            'max_students': self.max_students,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    # Keys of to_dict(), in order; also the fields a sparse fieldset (?fields=) can select
+    FIELDS = ('id', 'title', 'description', 'instructor_id', 'category', 'rating',
+              'max_students', 'enrolled_count', 'created_at', 'updated_at')
+    
+    def to_dict(self, fields=None):
+        """Convert course object to dictionary, limited to ``fields`` if given.
+        
+        Only the selected attributes are read, so a course loaded with
+        ``load_only`` for those fields serializes without further queries.
+        Timestamps stay datetimes; the app's JSON provider writes them as ISO 8601.
+        """
+        return {field: getattr(self, field) for field in fields or self.FIELDS}
 
 class Enrollment(db.Model):
     """Enrollment model for student-course relationships"""
     __tablename__ = 'enrollments'
+    __table_args__ = (
+        # One enrollment per student and course; also serves lookups by student_id
+        db.Index('uq_enrollments_student_course', 'student_id', 'course_id', unique=True),
+        # Capacity checks and per-status counts for a course
+        db.Index('ix_enrollments_course_status', 'course_id', 'completion_status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, nullable=False)  # References User.id from User Service
@@ -62,14 +84,85 @@ class Enrollment(db.Model):
             'id': self.id,
             'student_id': self.student_id,
             'course_id': self.course_id,
-            'enrollment_date': self.enrollment_date.isoformat() if self.enrollment_date else None,
+            'enrollment_date': self.enrollment_date,
             'completion_status': self.completion_status
         }
 
+class CourseAnalyticsRollup(db.Model):
+    """Per-category course and enrollment aggregates for analytics.
+    
+    Writes do not touch these rows: they append ``CourseAnalyticsDelta`` rows,
+    which are folded in periodically (see services/course_service/analytics.py).
+    """
+    __tablename__ = 'course_analytics_rollup'
+    
+    category = db.Column(db.String(100), primary_key=True)  # NULL categories are stored as 'uncategorized'
+    courses = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    rated = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # courses with a rating
+    enrollments = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    enrolled = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    in_progress = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    dropped = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CourseAnalyticsRollup {self.category}>'
+
+class CourseAnalyticsDelta(db.Model):
+    """One write transaction's change to a category's analytics counters.
+    
+    Append-only: course and enrollment writes insert these in their own
+    transaction instead of updating a shared rollup row, so they never wait on
+    each other. Analytics reads add pending deltas to the rollup until they
+    are folded in and deleted.
+    """
+    __tablename__ = 'course_analytics_deltas'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    category = db.Column(db.String(100), nullable=False)
+    courses = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    rated = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    enrollments = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    enrolled = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    in_progress = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    dropped = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CourseAnalyticsDelta {self.id} {self.category}>'
+
+class CourseAnalyticsFoldState(db.Model):
+    """Single row counting rollup folds, for O(1) course list validators.
+    
+    Every course or enrollment write appends a delta, and only folds (which
+    bump ``folds`` in the same transaction) delete them, so ``(folds, pending
+    delta count)`` changes whenever the catalog does.
+    """
+    __tablename__ = 'course_analytics_fold_state'
+    
+    id = db.Column(db.Integer, primary_key=True)  # always 1
+    folds = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_change_at = db.Column(db.DateTime)  # newest change folded in so far
+    
+    def __repr__(self):
+        return f'<CourseAnalyticsFoldState {self.folds}>'
+
+def dialect_insert(table):
+    """INSERT construct for the bound database that supports ON CONFLICT clauses"""
+    if db.engine.dialect.name == 'sqlite':
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
 def init_db(app):
     """Initialize database with Flask app"""
     db.init_app(app)
     migrate.init_app(app, db)
+    # Per-request query count/DB time (Server-Timing), slow-query log and N+1 warnings
+    init_request_timing(app)
     
     # Wait for database to be ready
     max_retries = 10
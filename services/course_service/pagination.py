@@ -0,0 +1,213 @@
+"""
+Sorting, keyset (cursor) pagination and row-count helpers for course listings
+"""
+
+import base64
+import json
+
+from sqlalchemy import and_, func, or_, text
+
+from services.course_service.models.database import db, Course
+
+# sort option -> (attribute name, ascending)
+SORT_OPTIONS = {
+    'id_asc': ('id', True),
+    'id_desc': ('id', False),
+    'title_asc': ('title', True),
+    'title_desc': ('title', False),
+    'rating_asc': ('rating', True),
+    'rating_desc': ('rating', False),
+}
+DEFAULT_SORT = 'id_asc'
+
+# include_total values -> how the total row count is produced
+TOTAL_MODES = {
+    'exact': 'exact', 'true': 'exact', '1': 'exact',
+    'estimate': 'estimate',
+    'none': 'none', 'false': 'none', '0': 'none',
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def sort_column(sort):
+    """Return ``(column, ascending)`` for a sort option, falling back to id_asc"""
+    attribute, ascending = SORT_OPTIONS.get(sort, SORT_OPTIONS[DEFAULT_SORT])
+    return getattr(Course, attribute), ascending
+
+
+def order_by_clauses(sort, reverse=False):
+    """ORDER BY clauses for a sort option, with ``id`` as a unique tie-breaker.
+
+    NULLs sort as the greatest value (last ascending, first descending), which
+    is PostgreSQL's default and lets the composite indexes serve both
+    directions.
+    """
+    column, ascending = sort_column(sort)
+    if reverse:
+        ascending = not ascending
+
+    if column is Course.id:
+        return [Course.id.asc() if ascending else Course.id.desc()]
+
+    if ascending:
+        ordered = column.asc().nullslast() if column.nullable else column.asc()
+        return [ordered, Course.id.asc()]
+
+    ordered = column.desc().nullsfirst() if column.nullable else column.desc()
+    return [ordered, Course.id.desc()]
+
+
+def keyset_filter(sort, value, last_id, reverse=False):
+    """WHERE clause selecting rows after ``(value, last_id)`` in the sort order.
+
+    With ``reverse`` it selects rows before that position instead, for
+    walking back to the previous page.
+    """
+    column, ascending = sort_column(sort)
+    if reverse:
+        ascending = not ascending
+
+    if column is Course.id:
+        return Course.id > last_id if ascending else Course.id < last_id
+
+    if ascending:
+        if value is None:
+            return and_(column.is_(None), Course.id > last_id)
+        after = or_(column > value, and_(column == value, Course.id > last_id))
+        return or_(after, column.is_(None)) if column.nullable else after
+
+    if value is None:
+        return or_(and_(column.is_(None), Course.id < last_id), column.isnot(None))
+    return or_(column < value, and_(column == value, Course.id < last_id))
+
+
+def encode_cursor(sort, course, direction):
+    """Opaque cursor pointing just past ``course`` in ``direction`` ('next' or 'prev')"""
+    column, _ = sort_column(sort)
+    payload = {'s': sort, 'v': getattr(course, column.key), 'i': course.id, 'd': direction}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into ``(sort, value, last_id, direction)``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        sort, value, last_id, direction = payload['s'], payload['v'], int(payload['i']), payload['d']
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+
+    if sort not in SORT_OPTIONS or direction not in ('next', 'prev'):
+        raise InvalidCursor("Invalid cursor: unknown sort or direction")
+    return sort, value, last_id, direction
+
+
+def keyset_page(query, sort, limit, cursor=None):
+    """Fetch one page of ``query`` using keyset pagination.
+
+    Returns ``(items, has_next, has_prev)``. Cost is independent of how deep
+    the page is: each page is an index range scan of ``limit + 1`` rows.
+    """
+    if cursor is None:
+        items = query.order_by(*order_by_clauses(sort)).limit(limit + 1).all()
+        return items[:limit], len(items) > limit, False
+
+    _, value, last_id, direction = cursor
+    backwards = direction == 'prev'
+    items = (query
+             .filter(keyset_filter(sort, value, last_id, reverse=backwards))
+             .order_by(*order_by_clauses(sort, reverse=backwards))
+             .limit(limit + 1)
+             .all())
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    if backwards:
+        items.reverse()
+        return items, True, has_more
+    return items, has_more, True
+
+
+def parse_total_mode(value, default):
+    """Normalise an ``include_total`` query value to 'exact', 'estimate' or 'none'"""
+    if value is None:
+        return default
+    mode = TOTAL_MODES.get(value.lower())
+    if mode is None:
+        raise ValueError("include_total must be one of: exact, estimate, none")
+    return mode
+
+
+def estimated_row_count(table_name):
+    """Planner row estimate for a whole table from ``pg_class.reltuples``.
+
+    Returns None when not running on PostgreSQL or when the table has never
+    been analyzed, so callers can fall back to an exact count.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return None
+
+    estimate = db.session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {'table_name': table_name}
+    ).scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+def count_total(query, total_mode, filtered):
+    """Total for ``query`` as ``(total, exact)`` using a separate COUNT or an estimate"""
+    if total_mode == 'none':
+        return None, None
+
+    if total_mode == 'estimate' and not filtered:
+        estimate = estimated_row_count(Course.__tablename__)
+        if estimate is not None:
+            return estimate, False
+
+    return query.order_by(None).count(), True
+
+
+def offset_page(query, sort, page, limit, total_mode, filtered):
+    """Fetch one OFFSET page of ``query`` without a separate COUNT(*) where possible.
+
+    ``exact`` totals come from a ``COUNT(*) OVER ()`` window on the page query
+    itself; ``estimate`` uses the planner's row estimate for unfiltered lists
+    (falling back to exact); ``none`` skips the total and detects a next page
+    by fetching one extra row. Returns ``(items, total, total_exact, has_next)``.
+    """
+    ordered = query.order_by(*order_by_clauses(sort))
+    offset = (page - 1) * limit
+
+    if total_mode == 'none':
+        items = ordered.offset(offset).limit(limit + 1).all()
+        return items[:limit], None, None, len(items) > limit
+
+    if total_mode == 'estimate' and not filtered:
+        estimate = estimated_row_count(Course.__tablename__)
+        if estimate is not None:
+            items = ordered.offset(offset).limit(limit + 1).all()
+            return items[:limit], max(estimate, offset + len(items[:limit])), False, len(items) > limit
+
+    items, total = windowed_page(ordered, page, limit)
+    return items, total, True, offset + limit < total
+
+
+def windowed_page(query, page, limit):
+    """One OFFSET page of an ordered ``query`` plus its total, in a single query.
+
+    The total comes from a ``COUNT(*) OVER ()`` column on the page query; only
+    a page past the end needs a separate COUNT. Returns ``(items, total)``.
+    """
+    rows = query.add_columns(func.count().over().label('total_count')).offset((page - 1) * limit).limit(limit).all()
+    if rows:
+        return [row[0] for row in rows], rows[0].total_count
+    if page > 1:
+        # Past the last page the window has no rows to report on
+        return [], query.order_by(None).count()
+    return [], 0
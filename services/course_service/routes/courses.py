@@ -1,59 +1,380 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, abort, request, jsonify, stream_with_context
 from services.course_service.models.database import db, Course, Enrollment
+from services.course_service import enrollment as enrollment_service
+from services.course_service.analytics import (
+    RollupDelta, category_key, course_analytics, enrollment_counts, rebuild_rollup
+)
+from services.course_service import streaming
+from services.course_service.conditional import course_list_version, make_etag, not_modified, with_validators
+from services.course_service.instructor_cache import instructor_cache
+from services.course_service.pagination import (
+    DEFAULT_SORT, SORT_OPTIONS, InvalidCursor, count_total, decode_cursor, encode_cursor, keyset_page,
+    offset_page, parse_total_mode, sort_column, windowed_page
+)
+from middleware.api_key import require_api_key
+from middleware.response_cache import analytics_cache
+from services.course_service.user_client import user_client
 import requests
 import os
 from datetime import datetime
+from urllib.parse import urlencode
+from sqlalchemy import delete, select
+from sqlalchemy.orm import joinedload, load_only
 
 courses_bp = Blueprint('courses', __name__)
 
 # User Service URL
 USER_SERVICE_URL = os.getenv('USER_SERVICE_URL', 'http://localhost:5002')
 
+# Largest page served by cursor pagination
+MAX_CURSOR_PAGE_SIZE = 100
+
+# Maximum number of IDs sent to the User Service batch endpoint per call
+INSTRUCTOR_BATCH_SIZE = 100
+
+# Page size for student enrollment listings
+ENROLLMENTS_PAGE_SIZE = 50
+MAX_ENROLLMENTS_PAGE_SIZE = 100
+
+# Upper bound on (student, course) pairs accepted by the bulk enrollment endpoint
+MAX_BULK_ENROLLMENTS = 5000
+
+# How list endpoints render per-item HATEOAS links (?links=): an absolute-URL
+# `_links` block per item, one collection-level `_templates` block, or nothing
+LINK_MODES = ('full', 'compact', 'none')
+
+# Related resources that can be embedded with ?expand=
+EXPANDABLE = ('instructor',)
+
+# How uncached instructors are resolved: 'batch' (one call per page) or
+# 'concurrent' (parallel single-user calls, for User Services without the batch endpoint)
+INSTRUCTOR_LOOKUP_MODE = os.getenv('INSTRUCTOR_LOOKUP_MODE', 'batch')
+
 def get_instructor_details(instructor_id):
     """Fetch instructor details from User Service"""
+    hit, instructor = instructor_cache.lookup(instructor_id)
+    if hit:
+        return instructor
+    
     try:
-        response = requests.get(f"{USER_SERVICE_URL}/api/users/{instructor_id}")
+        response = user_client.get(f"/api/users/{instructor_id}")
         if response.status_code == 200:
-            return response.json().get('user')
+            instructor = response.json().get('user')
+            instructor_cache.store(instructor_id, instructor)
+            return instructor
         else:
+            if response.status_code == 404:
+                instructor_cache.store_missing(instructor_id)
             return None
-    except Exception as e:
+    except requests.RequestException as e:
         print(f"Error fetching instructor details: {e}")
-        return None
+        # User Service unavailable (or circuit open): serve last-known data
+        return instructor_cache.lookup_stale(instructor_id)
+
+def get_instructors_details(instructor_ids):
+    """Fetch details for many instructors from User Service, keyed by ID.
+    
+    IDs are de-duplicated and served from the instructor cache where possible;
+    the rest are resolved according to INSTRUCTOR_LOOKUP_MODE, so a page of
+    courses costs about one User Service round trip instead of one per course.
+    Unknown IDs are simply absent from the result.
+    """
+    unique_ids = sorted({instructor_id for instructor_id in instructor_ids if instructor_id is not None})
+    instructors, not_found = verify_instructors(unique_ids)
+    
+    # IDs the User Service failed to answer for (errors, deadline, open circuit):
+    # serve last-known data where we have it, otherwise callers use the placeholder
+    unresolved_ids = set(unique_ids) - set(instructors) - set(not_found)
+    for instructor_id in unresolved_ids:
+        stale = instructor_cache.lookup_stale(instructor_id)
+        if stale is not None:
+            instructors[instructor_id] = stale
+    
+    return instructors
+
+def verify_instructors(instructor_ids):
+    """Resolve instructors through the instructor cache and User Service.
+    
+    Returns ``(found, not_found)`` like ``fetch_instructors_batched``: IDs in
+    neither could not be verified (User Service errors, deadline, open
+    circuit) and must not be treated as unknown.
+    """
+    found = {}
+    not_found = []
+    
+    # Serve what we can from the cache (including cached 404s)
+    missing_ids = []
+    for instructor_id in instructor_ids:
+        hit, instructor = instructor_cache.lookup(instructor_id)
+        if not hit:
+            missing_ids.append(instructor_id)
+        elif instructor is not None:
+            found[instructor_id] = instructor
+        else:
+            not_found.append(instructor_id)
+    
+    if not missing_ids:
+        return found, not_found
+    
+    if INSTRUCTOR_LOOKUP_MODE == 'concurrent':
+        fetched, fetched_not_found = fetch_instructors_concurrently(missing_ids)
+    else:
+        fetched, fetched_not_found = fetch_instructors_batched(missing_ids)
+    
+    for instructor_id, instructor in fetched.items():
+        found[instructor_id] = instructor
+        instructor_cache.store(instructor_id, instructor)
+    for instructor_id in fetched_not_found:
+        instructor_cache.store_missing(instructor_id)
+    
+    return found, not_found + list(fetched_not_found)
+
+def fetch_instructors_batched(instructor_ids):
+    """Resolve instructors with the User Service batch endpoint.
+    
+    Returns ``(found, not_found)``: a dict of instructors by ID and the IDs the
+    User Service confirmed do not exist. Falls back to concurrent single-user
+    lookups if the User Service does not provide the batch endpoint.
+    """
+    found = {}
+    not_found = []
+    
+    for start in range(0, len(instructor_ids), INSTRUCTOR_BATCH_SIZE):
+        chunk = instructor_ids[start:start + INSTRUCTOR_BATCH_SIZE]
+        try:
+            response = user_client.get(
+                "/api/users/batch",
+                params={'ids': ','.join(str(instructor_id) for instructor_id in chunk)}
+            )
+            users = response.json().get('users', []) if response.status_code == 200 else None
+        except requests.RequestException as e:
+            print(f"Error fetching instructor details: {e}")
+            continue
+        
+        if users is not None:
+            for user in users:
+                found[user['id']] = user
+            not_found.extend(instructor_id for instructor_id in chunk if instructor_id not in found)
+        elif response.status_code == 404:
+            # Older User Service without /api/users/batch
+            chunk_found, chunk_not_found = fetch_instructors_concurrently(chunk)
+            found.update(chunk_found)
+            not_found.extend(chunk_not_found)
+    
+    return found, not_found
+
+def fetch_instructors_concurrently(instructor_ids):
+    """Resolve instructors with parallel single-user calls to User Service.
+    
+    Lookups run on the client's shared worker pool, capped per request and
+    bounded by an overall deadline; instructors that do not resolve in time
+    are left out (and not negatively cached). Returns ``(found, not_found)``.
+    """
+    paths = {f"/api/users/{instructor_id}": instructor_id for instructor_id in instructor_ids}
+    results = user_client.get_concurrently(paths)
+    
+    found = {}
+    not_found = []
+    for path, result in results.items():
+        instructor_id = paths[path]
+        try:
+            if isinstance(result, Exception):
+                raise result
+            if result.status_code == 200:
+                found[instructor_id] = result.json().get('user')
+            elif result.status_code == 404:
+                not_found.append(instructor_id)
+        except requests.RequestException as e:
+            print(f"Error fetching instructor details: {e}")
+    
+    return found, not_found
+
+def instructor_or_placeholder(instructors, instructor_id):
+    """Return the fetched instructor, or a placeholder if it could not be resolved"""
+    return instructors.get(instructor_id) or {'id': instructor_id, 'name': 'Unknown Instructor'}
+
+def course_link_builder(base_url):
+    """Return a function building a course's HATEOAS links.
+    
+    The URL prefixes are formatted once, so a page of courses costs a few
+    string concatenations per course instead of five f-strings.
+    """
+    course_prefix = f"{base_url}/courses/"
+    instructor_prefix = f"{USER_SERVICE_URL}/api/users/"
+    
+    def build_links(course_id, instructor_id):
+        course_url = course_prefix + str(course_id)
+        return {
+            'self': {
+                'href': course_url,
+                'method': 'GET'
+            },
+            'update': {
+                'href': course_url,
+                'method': 'PUT'
+            },
+            'delete': {
+                'href': course_url,
+                'method': 'DELETE'
+            },
+            'enroll': {
+                'href': course_url + '/enroll',
+                'method': 'POST'
+            },
+            'instructor': {
+                'href': instructor_prefix + str(instructor_id),
+                'method': 'GET'
+            }
+        }
+    
+    return build_links
 
 def add_hateoas_links(course_dict, base_url):
     """Add HATEOAS links to course dictionary"""
-    course_id = course_dict['id']
-    course_dict['_links'] = {
+    course_dict['_links'] = course_link_builder(base_url)(course_dict['id'], course_dict['instructor_id'])
+    return course_dict
+
+def course_link_templates(base_url):
+    """URI templates for course links, sent once per collection with ``links=compact``"""
+    course_url = f"{base_url}/courses/{{id}}"
+    return {
         'self': {
-            'href': f"{base_url}/courses/{course_id}",
-            'method': 'GET'
+            'href': course_url,
+            'method': 'GET',
+            'templated': True
         },
         'update': {
-            'href': f"{base_url}/courses/{course_id}",
-            'method': 'PUT'
+            'href': course_url,
+            'method': 'PUT',
+            'templated': True
         },
         'delete': {
-            'href': f"{base_url}/courses/{course_id}",
-            'method': 'DELETE'
+            'href': course_url,
+            'method': 'DELETE',
+            'templated': True
         },
         'enroll': {
-            'href': f"{base_url}/courses/{course_id}/enroll",
-            'method': 'POST'
+            'href': course_url + '/enroll',
+            'method': 'POST',
+            'templated': True
         },
         'instructor': {
-            'href': f"{USER_SERVICE_URL}/api/users/{course_dict['instructor_id']}",
-            'method': 'GET'
+            'href': f"{USER_SERVICE_URL}/api/users/{{instructor_id}}",
+            'method': 'GET',
+            'templated': True
         }
     }
-    return course_dict
+
+def parse_link_mode():
+    """Read ``?links=full|compact|none`` (default full); raises ValueError for anything else"""
+    link_mode = request.args.get('links', 'full')
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"links must be one of: {', '.join(LINK_MODES)}")
+    return link_mode
+
+def parse_fields():
+    """Read ``?fields=`` into Course fields in canonical order, or None for all of them.
+    
+    ``id`` is always included. Raises ValueError for unknown fields.
+    """
+    value = request.args.get('fields')
+    if value is None:
+        return None
+    
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(Course.FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(Course.FIELDS)}")
+    return tuple(field for field in Course.FIELDS if field in requested or field == 'id')
+
+def parse_expand(fields):
+    """Read ``?expand=`` into the set of related resources to embed.
+    
+    Without it the instructor is embedded in full representations only, so
+    sparse (``fields=``) requests make no User Service calls unless they ask
+    for ``expand=instructor``; ``expand=`` (empty) turns it off everywhere.
+    Raises ValueError for unknown names.
+    """
+    value = request.args.get('expand')
+    if value is None:
+        return set() if fields else set(EXPANDABLE)
+    
+    expand = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = expand - set(EXPANDABLE)
+    if unknown:
+        raise ValueError(f"Cannot expand: {', '.join(sorted(unknown))}. Available: {', '.join(EXPANDABLE)}")
+    return expand
+
+def representation_params():
+    """The ``links``/``fields``/``expand`` parameters of this request, for pagination links"""
+    return {name: request.args[name] for name in ('links', 'fields', 'expand') if name in request.args}
+
+def course_columns(fields, expand, link_mode, *extra):
+    """Course attributes to load for a sparse response, or None to load every column.
+    
+    Besides the requested fields, ``instructor_id`` is loaded when the
+    instructor is expanded or linked, plus any ``extra`` attributes the caller
+    needs (sort keys, validators).
+    """
+    if fields is None:
+        return None
+    
+    needed = set(fields).union(extra)
+    if 'instructor' in expand or link_mode == 'full':
+        needed.add('instructor_id')
+    return [getattr(Course, name) for name in Course.FIELDS if name in needed]
+
+def serialize_courses(courses, base_url, link_mode='full', fields=None, expand=EXPANDABLE):
+    """Convert courses to dictionaries enriched with instructors and HATEOAS links.
+    
+    Only ``fields`` are serialized (all when None). Instructors are fetched
+    only if ``'instructor'`` is in ``expand``. Per-course ``_links`` are only
+    built in ``full`` link mode; ``compact`` callers send
+    ``course_link_templates`` once instead and ``none`` omits links.
+    """
+    # Resolve every instructor on the page with a single User Service call
+    instructors = None
+    if 'instructor' in expand:
+        instructors = get_instructors_details(course.instructor_id for course in courses)
+    build_links = course_link_builder(base_url) if link_mode == 'full' else None
+    
+    enriched_courses = []
+    for course in courses:
+        course_dict = course.to_dict(fields)
+        if instructors is not None:
+            course_dict['instructor'] = instructor_or_placeholder(instructors, course.instructor_id)
+        
+        # Add HATEOAS links
+        if build_links:
+            course_dict['_links'] = build_links(course.id, course.instructor_id)
+        enriched_courses.append(course_dict)
+    
+    return enriched_courses
 
 @courses_bp.route('/courses', methods=['GET'])
 def get_courses():
-    """Get all courses with pagination, filtering, and sorting"""
+    """Get all courses with pagination, filtering, and sorting.
+    
+    Uses page/limit (OFFSET) pagination by default. Passing ``cursor`` (empty
+    for the first page) switches to keyset pagination, whose cost does not
+    grow with page depth and which is stable under concurrent inserts.
+    
+    ``include_total`` controls the row count: ``exact`` (default for page
+    mode), ``estimate`` (planner estimate for unfiltered lists) or ``none``
+    (default for cursor mode).
+    """
     # Pagination
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 10, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = max(request.args.get('limit', 10, type=int), 1)
+    cursor_mode = 'cursor' in request.args
+    
+    try:
+        total_mode = parse_total_mode(request.args.get('include_total'), 'none' if cursor_mode else 'exact')
+        link_mode = parse_link_mode()
+        fields = parse_fields()
+        expand = parse_expand(fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Filtering
     category = request.args.get('category')
@@ -67,40 +388,33 @@ def get_courses():
     if category:
         query = query.filter(Course.category == category)
     
-    # Apply sorting
-    if sort == 'title_asc':
-        query = query.order_by(Course.title.asc())
-    elif sort == 'title_desc':
-        query = query.order_by(Course.title.desc())
-    elif sort == 'rating_asc':
-        query = query.order_by(Course.rating.asc())
-    elif sort == 'rating_desc':
-        query = query.order_by(Course.rating.desc())
-    elif sort == 'id_desc':
-        query = query.order_by(Course.id.desc())
-    else:  # default: id_asc
-        query = query.order_by(Course.id.asc())
-    
-    # Paginate
-    pagination = query.paginate(page=page, per_page=limit, error_out=False)
-    courses = pagination.items
+    # Conditional GET: the catalog's change version decides, before paging and instructor enrichment
+    version, last_modified = course_list_version()
+    validators = (make_etag('courses', *version, last_modified), last_modified)
+    unchanged = not_modified(*validators)
+    if unchanged:
+        return unchanged
+    
+    if cursor_mode:
+        return get_courses_by_cursor(
+            query, request.args.get('cursor'), limit, category, sort, total_mode, validators,
+            link_mode=link_mode, fields=fields, expand=expand
+        )
+    
+    # Sparse fieldsets narrow the SELECT list to the columns the response uses
+    columns = course_columns(fields, expand, link_mode, sort_column(sort)[0].key)
+    if columns:
+        query = query.options(load_only(*columns))
+    
+    # Apply sorting and paginate; the total comes from the page query itself
+    courses, total, total_exact, has_next = offset_page(query, sort, page, limit, total_mode, filtered=bool(category))
+    has_prev = page > 1
     
     # Get base URL for HATEOAS links
     base_url = request.url_root.rstrip('/')
     
-    # Enrich courses with instructor details from User Service and add HATEOAS links
-    enriched_courses = []
-    for course in courses:
-        course_dict = course.to_dict()
-        instructor = get_instructor_details(course.instructor_id)
-        if instructor:
-            course_dict['instructor'] = instructor
-        else:
-            course_dict['instructor'] = {'id': course.instructor_id, 'name': 'Unknown Instructor'}
-        
-        # Add HATEOAS links
-        course_dict = add_hateoas_links(course_dict, base_url)
-        enriched_courses.append(course_dict)
+    # Enrich courses with instructor details and add HATEOAS links
+    enriched_courses = serialize_courses(courses, base_url, link_mode, fields, expand)
     
     # Prepare response with HATEOAS links for pagination
     response_data = {
@@ -108,10 +422,11 @@ def get_courses():
         'pagination': {
             'page': page,
             'limit': limit,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'has_next': pagination.has_next,
-            'has_prev': pagination.has_prev
+            'total': total,
+            'total_exact': total_exact,
+            'pages': -(-total // limit) if total is not None else None,
+            'has_next': has_next,
+            'has_prev': has_prev
         },
         'filters': {
             'category': category,
@@ -130,29 +445,117 @@ def get_courses():
     }
     
     # Add pagination links
-    if pagination.has_next:
+    if has_next:
         next_url = request.base_url + f"?page={page + 1}&limit={limit}"
         if category:
             next_url += f"&category={category}"
         if sort != 'id_asc':
             next_url += f"&sort={sort}"
+        if 'include_total' in request.args:
+            next_url += f"&include_total={total_mode}"
+        if representation_params():
+            next_url += f"&{urlencode(representation_params())}"
         response_data['_links']['next'] = {
             'href': next_url,
             'method': 'GET'
         }
     
-    if pagination.has_prev:
+    if has_prev:
         prev_url = request.base_url + f"?page={page - 1}&limit={limit}"
         if category:
             prev_url += f"&category={category}"
         if sort != 'id_asc':
             prev_url += f"&sort={sort}"
+        if 'include_total' in request.args:
+            prev_url += f"&include_total={total_mode}"
+        if representation_params():
+            prev_url += f"&{urlencode(representation_params())}"
         response_data['_links']['prev'] = {
             'href': prev_url,
             'method': 'GET'
         }
     
-    return jsonify(response_data)
+    if link_mode == 'compact':
+        response_data['_templates'] = course_link_templates(base_url)
+    
+    return with_validators(jsonify(response_data), *validators)
+
+def get_courses_by_cursor(query, cursor, limit, category, sort, total_mode, validators,
+                          link_mode='full', fields=None, expand=EXPANDABLE):
+    """Keyset-paginated course listing for GET /courses?cursor=..."""
+    limit = max(1, min(limit, MAX_CURSOR_PAGE_SIZE))
+    
+    decoded = None
+    if cursor:
+        try:
+            decoded = decode_cursor(cursor)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        # The cursor carries the sort it was issued for
+        sort = decoded[0]
+    elif sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+    
+    # Sparse fieldsets still load the sort key, which the cursors encode
+    columns = course_columns(fields, expand, link_mode, sort_column(sort)[0].key)
+    if columns:
+        query = query.options(load_only(*columns))
+    
+    courses, has_next, has_prev = keyset_page(query, sort, limit, decoded)
+    total, total_exact = count_total(query, total_mode, filtered=bool(category))
+    
+    # Get base URL for HATEOAS links
+    base_url = request.url_root.rstrip('/')
+    
+    next_cursor = encode_cursor(sort, courses[-1], 'next') if has_next and courses else None
+    prev_cursor = encode_cursor(sort, courses[0], 'prev') if has_prev and courses else None
+    
+    response_data = {
+        'courses': serialize_courses(courses, base_url, link_mode, fields, expand),
+        'pagination': {
+            'mode': 'cursor',
+            'limit': limit,
+            'total': total,
+            'total_exact': total_exact,
+            'has_next': next_cursor is not None,
+            'has_prev': prev_cursor is not None,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        },
+        'filters': {
+            'category': category,
+            'sort': sort
+        },
+        '_links': {
+            'self': {
+                'href': request.url,
+                'method': 'GET'
+            },
+            'create': {
+                'href': f"{base_url}/courses",
+                'method': 'POST'
+            }
+        }
+    }
+    
+    # Add pagination links
+    for rel, page_cursor in (('next', next_cursor), ('prev', prev_cursor)):
+        if page_cursor:
+            params = {'cursor': page_cursor, 'limit': limit}
+            if category:
+                params['category'] = category
+            if total_mode != 'none':
+                params['include_total'] = total_mode
+            params.update(representation_params())
+            response_data['_links'][rel] = {
+                'href': f"{request.base_url}?{urlencode(params)}",
+                'method': 'GET'
+            }
+    
+    if link_mode == 'compact':
+        response_data['_templates'] = course_link_templates(base_url)
+    
+    return with_validators(jsonify(response_data), *validators)
 
 @courses_bp.route('/courses', methods=['POST'])
 def create_course():
@@ -176,6 +579,12 @@ def create_course():
     )
     
     db.session.add(new_course)
+    db.session.flush()
+    
+    # Keep the analytics rollup in step, in the same transaction
+    rollup = RollupDelta()
+    rollup.add_course(new_course.category, new_course.rating)
+    rollup.apply()
     db.session.commit()
     
     # Get base URL for HATEOAS links
@@ -191,26 +600,83 @@ def create_course():
         'course': course_dict
     }), 201
 
+@courses_bp.route('/courses/import', methods=['POST'])
+def import_courses():
+    """Bulk-create courses from a streamed NDJSON or CSV request body"""
+    fmt = streaming.import_format(request.mimetype, request.args.get('format'))
+    if fmt is None:
+        return jsonify({'error': 'Send application/x-ndjson or text/csv, or set format=ndjson|csv'}), 415
+    
+    batch_size = request.args.get('batch_size', streaming.IMPORT_BATCH_SIZE, type=int)
+    batch_size = max(1, min(batch_size, streaming.MAX_IMPORT_BATCH_SIZE))
+    
+    # Rows are read from the body as they arrive; instructors are verified in bulk per batch
+    importer = streaming.CourseImport(verify_instructors, batch_size=batch_size)
+    summary = importer.run(streaming.read_rows(request.stream, fmt))
+    
+    if summary['aborted']:
+        # The User Service could not confirm instructors: stop instead of rejecting good rows
+        return jsonify(summary), 503
+    return jsonify(summary)
+
+def export_response(statement, fmt, name):
+    """Stream the rows of ``statement`` as an NDJSON or CSV attachment"""
+    return Response(
+        stream_with_context(streaming.export_rows(statement, fmt)),
+        mimetype=streaming.EXPORT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename={name}.{fmt}'}
+    )
+
+@courses_bp.route('/courses/export', methods=['GET'])
+def export_courses():
+    """Stream the whole course catalog as NDJSON or CSV (?format=ndjson|csv)"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in streaming.EXPORT_MIMETYPES:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    statement = select(Course.__table__).order_by(Course.id)
+    category = request.args.get('category')
+    if category:
+        statement = statement.where(Course.category == category)
+    
+    return export_response(statement, fmt, 'courses')
+
 @courses_bp.route('/courses/<int:course_id>', methods=['GET'])
 def get_course(course_id):
-    """Get a specific course by ID"""
-    course = Course.query.get_or_404(course_id)
-    course_dict = course.to_dict()
+    """Get a specific course by ID (supports ``fields`` and ``expand``)"""
+    try:
+        fields = parse_fields()
+        expand = parse_expand(fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Sparse fieldsets load only the requested columns (plus the validator)
+    query = Course.query
+    columns = course_columns(fields, expand, 'full', 'updated_at')
+    if columns:
+        query = query.options(load_only(*columns))
+    course = query.get_or_404(course_id)
+    
+    # Conditional GET: skip enrichment and serialization when the client's copy is current
+    validators = (make_etag('course', course.id, course.updated_at), course.updated_at)
+    unchanged = not_modified(*validators)
+    if unchanged:
+        return unchanged
+    
+    course_dict = course.to_dict(fields)
     
     # Get base URL for HATEOAS links
     base_url = request.url_root.rstrip('/')
     
     # Enrich with instructor details
-    instructor = get_instructor_details(course.instructor_id)
-    if instructor:
-        course_dict['instructor'] = instructor
-    else:
-        course_dict['instructor'] = {'id': course.instructor_id, 'name': 'Unknown Instructor'}
+    if 'instructor' in expand:
+        instructors = get_instructors_details([course.instructor_id])
+        course_dict['instructor'] = instructor_or_placeholder(instructors, course.instructor_id)
     
-    # Add HATEOAS links
-    course_dict = add_hateoas_links(course_dict, base_url)
+    # Add HATEOAS links (from the model: a sparse course_dict may lack instructor_id)
+    course_dict['_links'] = course_link_builder(base_url)(course.id, course.instructor_id)
     
-    return jsonify({'course': course_dict})
+    return with_validators(jsonify({'course': course_dict}), *validators)
 
 @courses_bp.route('/courses/<int:course_id>', methods=['PUT'])
 def update_course(course_id):
@@ -221,6 +687,8 @@ def update_course(course_id):
     if not data:
         return jsonify({'error': 'No data provided'}), 400
     
+    old_category, old_rating = course.category, course.rating
+    
     # Update fields if provided
     if 'title' in data:
         course.title = data['title']
@@ -233,6 +701,19 @@ def update_course(course_id):
     if 'max_students' in data:
         course.max_students = data['max_students']
     
+    # Move the course (and its enrollments, if the category changed) within the analytics rollup
+    if (course.category, course.rating) != (old_category, old_rating):
+        rollup = RollupDelta()
+        rollup.add_course(old_category, old_rating, sign=-1)
+        rollup.add_course(course.category, course.rating)
+        if category_key(course.category) != category_key(old_category):
+            # Flushing locks the course row first, so no enrollment can slip in between
+            db.session.flush()
+            counts = enrollment_counts(course_id)
+            rollup.add_enrollments(old_category, counts, sign=-1)
+            rollup.add_enrollments(course.category, counts)
+        rollup.apply()
+    
     db.session.commit()
     
     # Get base URL for HATEOAS links
@@ -240,11 +721,8 @@ def update_course(course_id):
     
     # Enrich with instructor details
     course_dict = course.to_dict()
-    instructor = get_instructor_details(course.instructor_id)
-    if instructor:
-        course_dict['instructor'] = instructor
-    else:
-        course_dict['instructor'] = {'id': course.instructor_id, 'name': 'Unknown Instructor'}
+    instructors = get_instructors_details([course.instructor_id])
+    course_dict['instructor'] = instructor_or_placeholder(instructors, course.instructor_id)
     
     # Add HATEOAS links
     course_dict = add_hateoas_links(course_dict, base_url)
@@ -259,8 +737,18 @@ def delete_course(course_id):
     """Delete a course"""
     course = Course.query.get_or_404(course_id)
     
-    # Delete associated enrollments first
-    Enrollment.query.filter_by(course_id=course_id).delete()
+    # Delete associated enrollments first, counting them out of the analytics rollup
+    statuses = db.session.execute(
+        delete(Enrollment).where(Enrollment.course_id == course_id).returning(Enrollment.completion_status)
+    ).scalars().all()
+    
+    rollup = RollupDelta()
+    rollup.add_course(course.category, course.rating, sign=-1)
+    rollup.add_enrollments(course.category, {
+        'enrollments': len(statuses),
+        **{status: statuses.count(status) for status in set(statuses) if status}
+    }, sign=-1)
+    rollup.apply()
     
     db.session.delete(course)
     db.session.commit()
@@ -270,37 +758,25 @@ def delete_course(course_id):
 @courses_bp.route('/courses/<int:course_id>/enroll', methods=['POST'])
 def enroll_student(course_id):
     """Enroll a student in a course"""
-    course = Course.query.get_or_404(course_id)
     data = request.get_json()
     
     if not data or 'student_id' not in data:
         return jsonify({'error': 'student_id is required'}), 400
     
     student_id = data['student_id']
+    if not isinstance(student_id, int) or isinstance(student_id, bool):
+        return jsonify({'error': 'student_id must be an integer'}), 400
     
-    # Check if already enrolled
-    existing_enrollment = Enrollment.query.filter_by(
-        student_id=student_id, 
-        course_id=course_id
-    ).first()
+    # Claim a seat and insert the enrollment atomically (no duplicate check or COUNT(*) round trips)
+    outcome, enrollment = enrollment_service.enroll_student(course_id, student_id)
     
-    if existing_enrollment:
+    if outcome == enrollment_service.COURSE_NOT_FOUND:
+        abort(404)
+    if outcome == enrollment_service.ALREADY_ENROLLED:
         return jsonify({'error': 'Student already enrolled in this course'}), 400
-    
-    # Check if course is at capacity
-    current_enrollments = Enrollment.query.filter_by(course_id=course_id).count()
-    if current_enrollments >= course.max_students:
+    if outcome == enrollment_service.COURSE_FULL:
         return jsonify({'error': 'Course is at maximum capacity'}), 400
     
-    # Create enrollment
-    enrollment = Enrollment(
-        student_id=student_id,
-        course_id=course_id
-    )
-    
-    db.session.add(enrollment)
-    db.session.commit()
-    
     # Get base URL for HATEOAS links
     base_url = request.url_root.rstrip('/')
     
@@ -326,98 +802,228 @@ def enroll_student(course_id):
         'enrollment': enrollment_dict
     }), 201
 
+def parse_id_list(value):
+    """Return ``value`` as a list of integer IDs, or None if it is not a non-empty list of integers"""
+    if not isinstance(value, list) or not value:
+        return None
+    if not all(isinstance(item, int) and not isinstance(item, bool) for item in value):
+        return None
+    return value
+
+@courses_bp.route('/enrollments/bulk', methods=['POST'])
+def bulk_enroll_students():
+    """Enroll many students in one or more courses in a single request"""
+    data = request.get_json(silent=True)
+    
+    if not data or 'student_ids' not in data:
+        return jsonify({'error': 'student_ids is required'}), 400
+    
+    student_ids = parse_id_list(data['student_ids'])
+    if student_ids is None:
+        return jsonify({'error': 'student_ids must be a non-empty list of integers'}), 400
+    
+    if ('course_id' in data) == ('course_ids' in data):
+        return jsonify({'error': 'Exactly one of course_id or course_ids is required'}), 400
+    
+    course_ids = parse_id_list(data['course_ids'] if 'course_ids' in data else [data['course_id']])
+    if course_ids is None:
+        return jsonify({'error': 'course_ids must be a non-empty list of integers'}), 400
+    
+    pairs = len(set(student_ids)) * len(set(course_ids))
+    if pairs > MAX_BULK_ENROLLMENTS:
+        return jsonify({'error': f'At most {MAX_BULK_ENROLLMENTS} enrollments may be requested at once'}), 400
+    
+    results = enrollment_service.enroll_students(course_ids, student_ids)
+    
+    summary = {status: 0 for status in (enrollment_service.ENROLLED, enrollment_service.ALREADY_ENROLLED,
+                                        enrollment_service.COURSE_FULL, enrollment_service.COURSE_NOT_FOUND)}
+    for result in results:
+        summary[result['status']] += 1
+    
+    return jsonify({
+        'results': results,
+        'summary': summary,
+        'total': len(results)
+    })
+
+@courses_bp.route('/enrollments/export', methods=['GET'])
+@require_api_key
+def export_enrollments():
+    """Stream all enrollments as NDJSON or CSV (requires API key)"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in streaming.EXPORT_MIMETYPES:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    statement = select(Enrollment.__table__).order_by(Enrollment.id)
+    course_id = request.args.get('course_id', type=int)
+    if course_id is not None:
+        statement = statement.where(Enrollment.course_id == course_id)
+    
+    return export_response(statement, fmt, 'enrollments')
+
 @courses_bp.route('/enrollments/student/<int:student_id>', methods=['GET'])
 def get_student_enrollments(student_id):
-    """Get all enrollments for a specific student"""
-    enrollments = Enrollment.query.filter_by(student_id=student_id).all()
+    """Get a page of enrollments for a specific student (``fields``/``expand`` apply to the courses)"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = request.args.get('limit', ENROLLMENTS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_ENROLLMENTS_PAGE_SIZE))
+    
+    try:
+        link_mode = parse_link_mode()
+        fields = parse_fields()
+        expand = parse_expand(fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Enrollments, their courses and the total in one query (no lazy load per enrollment)
+    course_loader = joinedload(Enrollment.course)
+    columns = course_columns(fields, expand, link_mode)
+    if columns:
+        course_loader = course_loader.load_only(*columns)
+    query = (Enrollment.query
+             .filter_by(student_id=student_id)
+             .options(course_loader)
+             .order_by(Enrollment.id))
+    enrollments, total = windowed_page(query, page, limit)
+    has_next = page * limit < total
+    has_prev = page > 1
     
     # Get base URL for HATEOAS links
     base_url = request.url_root.rstrip('/')
     
+    # Resolve the instructors of all enrolled courses with a single User Service call
+    instructors = None
+    if 'instructor' in expand:
+        instructors = get_instructors_details(enrollment.course.instructor_id for enrollment in enrollments)
+    
+    # Link prefixes are built once per request, not per enrollment
+    build_links = course_link_builder(base_url) if link_mode == 'full' else None
+    self_url = f"{base_url}/enrollments/student/{student_id}"
+    student_url = f"{USER_SERVICE_URL}/api/users/{student_id}"
+    course_prefix = f"{base_url}/courses/"
+    
     # Enrich with course details and HATEOAS links
     enriched_enrollments = []
     for enrollment in enrollments:
         enrollment_dict = enrollment.to_dict()
-        course_dict = enrollment.course.to_dict()
+        course_dict = enrollment.course.to_dict(fields)
         
         # Add instructor details
-        instructor = get_instructor_details(enrollment.course.instructor_id)
-        if instructor:
-            course_dict['instructor'] = instructor
-        else:
-            course_dict['instructor'] = {'id': enrollment.course.instructor_id, 'name': 'Unknown Instructor'}
-        
-        # Add HATEOAS links to course
-        course_dict = add_hateoas_links(course_dict, base_url)
+        if instructors is not None:
+            course_dict['instructor'] = instructor_or_placeholder(instructors, enrollment.course.instructor_id)
         enrollment_dict['course'] = course_dict
         
-        # Add HATEOAS links to enrollment
-        enrollment_dict['_links'] = {
-            'self': {
-                'href': f"{base_url}/enrollments/student/{student_id}",
-                'method': 'GET'
-            },
-            'course': {
-                'href': f"{base_url}/courses/{enrollment.course_id}",
-                'method': 'GET'
-            },
-            'student': {
-                'href': f"{USER_SERVICE_URL}/api/users/{student_id}",
-                'method': 'GET'
+        if build_links:
+            # Add HATEOAS links to course and enrollment
+            course_dict['_links'] = build_links(enrollment.course_id, enrollment.course.instructor_id)
+            enrollment_dict['_links'] = {
+                'self': {
+                    'href': self_url,
+                    'method': 'GET'
+                },
+                'course': {
+                    'href': course_prefix + str(enrollment.course_id),
+                    'method': 'GET'
+                },
+                'student': {
+                    'href': student_url,
+                    'method': 'GET'
+                }
             }
-        }
         
         enriched_enrollments.append(enrollment_dict)
     
-    return jsonify({
+    response_data = {
         'enrollments': enriched_enrollments,
         'student_id': student_id,
-        'total': len(enriched_enrollments),
+        'total': total,
+        'pagination': {
+            'page': page,
+            'limit': limit,
+            'total': total,
+            'pages': -(-total // limit),
+            'has_next': has_next,
+            'has_prev': has_prev
+        },
         '_links': {
             'self': {
-                'href': f"{base_url}/enrollments/student/{student_id}",
+                'href': self_url,
                 'method': 'GET'
             },
             'student': {
-                'href': f"{USER_SERVICE_URL}/api/users/{student_id}",
+                'href': student_url,
                 'method': 'GET'
             }
         }
+    }
+    
+    if link_mode == 'compact':
+        # Enrollment links are the collection's self/student links and the course's self template
+        response_data['_templates'] = course_link_templates(base_url)
+    
+    # Add pagination links
+    carried_params = f"&{urlencode(representation_params())}" if representation_params() else ''
+    if has_next:
+        response_data['_links']['next'] = {
+            'href': request.base_url + f"?page={page + 1}&limit={limit}{carried_params}",
+            'method': 'GET'
+        }
+    
+    if has_prev:
+        response_data['_links']['prev'] = {
+            'href': request.base_url + f"?page={page - 1}&limit={limit}{carried_params}",
+            'method': 'GET'
+        }
+    
+    return jsonify(response_data)
+
+@courses_bp.route('/instructor-cache', methods=['GET'])
+@require_api_key
+def instructor_cache_stats():
+    """Get instructor cache size and hit/miss/eviction counters (requires API key)"""
+    return jsonify({'instructor_cache': instructor_cache.stats()})
+
+@courses_bp.route('/instructor-cache', methods=['DELETE'])
+@require_api_key
+def invalidate_instructor_cache():
+    """Invalidate cached instructors (?ids=1,2,3), or the whole cache (?all=true)"""
+    if request.args.get('all', '').lower() == 'true':
+        removed = instructor_cache.clear()
+    else:
+        try:
+            instructor_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+        
+        if not instructor_ids:
+            return jsonify({'error': 'Provide ?ids=1,2,3 or ?all=true'}), 400
+        
+        removed = instructor_cache.invalidate(instructor_ids)
+    
+    return jsonify({
+        'message': 'Instructor cache invalidated',
+        'removed': removed,
+        'instructor_cache': instructor_cache.stats()
     })
 
+@courses_bp.route('/user-service-client', methods=['GET'])
+@require_api_key
+def user_service_client_stats():
+    """Get User Service client latency, failure and retry statistics (requires API key)"""
+    return jsonify({'user_service_client': user_client.stats()})
+
 @courses_bp.route('/analytics', methods=['GET'])
+@require_api_key
 def analytics():
     """
     Analytics endpoint that requires valid API key.
     Get analytics data about courses and enrollments.
     """
-    # Check for API key
-    api_key = request.args.get('apiKey')
-    expected_key = os.getenv('ANALYTICS_API_KEY', 'validKey')
-    
-    if not api_key or api_key != expected_key:
-        return jsonify({'error': 'Valid API key required. Use ?apiKey=validKey'}), 401
-    
-    # Generate analytics data
-    total_courses = Course.query.count()
-    total_enrollments = Enrollment.query.count()
-    
-    # Course categories breakdown
-    course_categories = {}
-    courses = Course.query.all()
-    for course in courses:
-        category = course.category or 'uncategorized'
-        course_categories[category] = course_categories.get(category, 0) + 1
-    
-    # Average rating
-    courses_with_rating = Course.query.filter(Course.rating.isnot(None)).all()
-    avg_rating = sum(c.rating for c in courses_with_rating) / len(courses_with_rating) if courses_with_rating else 0
-    
-    analytics_data = {
-        'total_courses': total_courses,
-        'total_enrollments': total_enrollments,
-        'course_categories': course_categories,
-        'average_rating': round(avg_rating, 2),
+    # Read the per-category rollup plus its pending deltas (no scans of courses or enrollments),
+    # cached for a few seconds and refreshed in the background once stale
+    cached, age, cache_state = analytics_cache.get('analytics', course_analytics)
+    analytics_data = dict(cached)
+    analytics_data.update({
         'timestamp': datetime.now().isoformat(),
         '_links': {
             'self': {
@@ -429,6 +1035,20 @@ def analytics():
                 'method': 'GET'
             }
         }
-    }
+    })
     
-    return jsonify(analytics_data)
\ No newline at end of file
+    response = jsonify(analytics_data)
+    response.headers['Age'] = str(int(age))
+    response.headers['X-Cache'] = cache_state.upper()
+    return response
+
+@courses_bp.route('/analytics/rollup', methods=['POST'])
+@require_api_key
+def rebuild_analytics_rollup():
+    """Recompute the analytics rollup from courses and enrollments (requires API key)"""
+    categories = rebuild_rollup()
+    
+    return jsonify({
+        'message': 'Analytics rollup rebuilt',
+        'categories': categories
+    })
@@ -0,0 +1,277 @@
+"""
+Streaming NDJSON/CSV import and export for courses and enrollments
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from services.course_service.analytics import RollupDelta
+from services.course_service.models.database import db, Course
+
+# Request content types accepted by the import endpoint, by format
+FORMAT_MIMETYPES = {
+    'ndjson': {'application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-lines'},
+    'csv': {'text/csv', 'application/csv'},
+}
+
+# Rows per batched INSERT (each batch is committed on its own)
+IMPORT_BATCH_SIZE = int(os.getenv('COURSE_IMPORT_BATCH_SIZE', 1000))
+MAX_IMPORT_BATCH_SIZE = 5000
+
+# Row errors listed in an import summary; further errors are only counted
+MAX_REPORTED_ERRORS = 100
+
+# Export formats -> response mimetype
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Rows fetched from the server-side cursor (and emitted) per chunk
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 1000))
+
+
+class ImportRowError(ValueError):
+    """Raised when an imported row cannot be turned into a course"""
+
+
+def import_format(mimetype, requested=None):
+    """Resolve the body format from ``?format=`` or the Content-Type; None if unsupported"""
+    if requested:
+        return requested if requested in FORMAT_MIMETYPES else None
+
+    for name, mimetypes in FORMAT_MIMETYPES.items():
+        if mimetype in mimetypes:
+            return name
+    return None
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, record, error)`` for each row of a binary NDJSON/CSV stream.
+
+    The stream is decoded one line at a time, so the body is never held in
+    memory as a whole.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='' if fmt == 'csv' else None)
+
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+
+
+def course_values(record):
+    """Validate an imported record and return the column values for a new course"""
+    if not isinstance(record, dict):
+        raise ImportRowError("Row must be an object")
+
+    # CSV has no nulls: treat empty cells as missing
+    record = {key: value for key, value in record.items() if value not in (None, '')}
+
+    title = record.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise ImportRowError("title is required")
+    if len(title) > 255:
+        raise ImportRowError("title must be at most 255 characters")
+
+    return {
+        'title': title,
+        'description': str(record.get('description', '')),
+        'instructor_id': _integer(record, 'instructor_id', required=True),
+        'category': str(record.get('category', 'general'))[:100],
+        'rating': _number(record, 'rating', 0.0),
+        'max_students': _integer(record, 'max_students', default=50),
+    }
+
+
+def _integer(record, field, default=None, required=False):
+    value = record.get(field)
+    if value is None:
+        if required:
+            raise ImportRowError(f"{field} is required")
+        return default
+    if isinstance(value, bool):
+        raise ImportRowError(f"{field} must be an integer")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f"{field} must be an integer")
+    if number != float(value):
+        raise ImportRowError(f"{field} must be an integer")
+    return number
+
+
+def _number(record, field, default):
+    value = record.get(field)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f"{field} must be a number")
+
+
+class InstructorsUnverified(Exception):
+    """Raised when the User Service could not confirm or deny some instructors"""
+
+    def __init__(self, instructor_ids):
+        super().__init__(f"Could not verify instructors {sorted(instructor_ids)}")
+        self.instructor_ids = instructor_ids
+
+
+class CourseImport:
+    """Insert streamed course rows in batches, verifying instructors once per distinct ID.
+
+    ``verify_instructors`` takes a collection of instructor IDs and returns
+    ``(found, not_found)``: the instructors the User Service knows (keyed by
+    ID) and the IDs it confirmed do not exist. Only the latter fail their
+    rows. IDs in neither (an outage, an open circuit) stop the import before
+    that batch, with ``aborted`` set and ``retry_from_line`` naming the first
+    line to send again. Verified IDs are remembered for the rest of the
+    import; unknown IDs are not, so an instructor created mid-import does not
+    fail every later row.
+    """
+
+    def __init__(self, verify_instructors, batch_size=IMPORT_BATCH_SIZE):
+        self.verify_instructors = verify_instructors
+        self.batch_size = batch_size
+        self._verified = set()
+        self._batch = []  # (line_number, values)
+        self.summary = {'rows': 0, 'imported': 0, 'failed': 0, 'batches': 0,
+                        'errors': [], 'errors_truncated': False,
+                        'aborted': False, 'abort_reason': None, 'retry_from_line': None}
+
+    def run(self, rows):
+        """Import ``(line_number, record, error)`` rows and return the summary"""
+        try:
+            self._run(rows)
+        except InstructorsUnverified as e:
+            self.summary['aborted'] = True
+            self.summary['abort_reason'] = f"User Service unavailable: {e}"
+        return self.summary
+
+    def _run(self, rows):
+        for line_number, record, error in rows:
+            self.summary['rows'] += 1
+            if error is None:
+                try:
+                    values = course_values(record)
+                except ImportRowError as e:
+                    error = str(e)
+
+            if error is not None:
+                self._fail(line_number, error)
+                continue
+
+            self._batch.append((line_number, values))
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+
+        self._flush()
+
+    def _flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+
+        unverified = {values['instructor_id'] for _, values in batch} - self._verified
+        if unverified:
+            found, not_found = self.verify_instructors(sorted(unverified))
+            self._verified.update(found)
+            unanswered = unverified - set(found) - set(not_found)
+            if unanswered:
+                # Nothing from this batch is written, so it can be resent as a whole
+                self.summary['retry_from_line'] = batch[0][0]
+                raise InstructorsUnverified(unanswered)
+
+        rows = []
+        for line_number, values in batch:
+            if values['instructor_id'] in self._verified:
+                rows.append(values)
+            else:
+                self._fail(line_number, f"Instructor {values['instructor_id']} not found")
+
+        if rows:
+            try:
+                # executemany: compiled once, sent as multi-row VALUES pages by the driver
+                db.session.execute(insert(Course.__table__), rows)
+                rollup = RollupDelta()
+                for values in rows:
+                    rollup.add_course(values['category'], values['rating'])
+                rollup.apply()
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                for line_number, values in batch:
+                    if values['instructor_id'] in self._verified:
+                        self._fail(line_number, f"Database error: {e.__class__.__name__}")
+                return
+            self.summary['imported'] += len(rows)
+        self.summary['batches'] += 1
+
+    def _fail(self, line_number, error):
+        self.summary['failed'] += 1
+        if len(self.summary['errors']) < MAX_REPORTED_ERRORS:
+            self.summary['errors'].append({'line': line_number, 'error': error})
+        else:
+            self.summary['errors_truncated'] = True
+
+
+def export_rows(statement, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield the result of ``statement`` as NDJSON or CSV text, one chunk at a time.
+
+    Rows are fetched ``chunk_rows`` at a time with ``yield_per`` (a server-side
+    cursor on PostgreSQL) as plain tuples rather than ORM objects, and each
+    chunk is serialized and yielded before the next is fetched, so memory
+    stays flat however large the table is. CSV output starts with the header
+    row, which is yielded before any row is fetched.
+    """
+    result = db.session.execute(statement.execution_options(yield_per=chunk_rows))
+    columns = list(result.keys())
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield _drain(buffer)
+
+        for partition in result.partitions():
+            writer.writerows([_csv_value(value) for value in row] for row in partition)
+            yield _drain(buffer)
+        return
+
+    for partition in result.partitions():
+        yield ''.join(
+            json.dumps(dict(zip(columns, (_json_value(value) for value in row)))) + '\n'
+            for row in partition
+        )
+
+
+def _drain(buffer):
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _csv_value(value):
+    return '' if value is None else _json_value(value)
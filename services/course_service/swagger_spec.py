@@ -2,6 +2,9 @@
 OpenAPI specification for Course Service
 """
 
+from middleware.spec_cache import cached_spec_response
+
+
 def get_swagger_spec():
     """Returns the OpenAPI specification for Course Service"""
     return {
@@ -29,6 +32,51 @@ def get_swagger_spec():
                     "description": "API key required for analytics endpoint"
                 }
             },
+            "parameters": {
+                "Fields": {
+                    "name": "fields",
+                    "in": "query",
+                    "description": "Comma-separated course fields to return (sparse fieldset); `id` is always included and only these columns are selected from the database. Available: id, title, description, instructor_id, category, rating, max_students, enrolled_count, created_at, updated_at.",
+                    "schema": {"type": "string", "example": "title,category,rating"}
+                },
+                "Expand": {
+                    "name": "expand",
+                    "in": "query",
+                    "description": "Related resources to embed: `instructor` (fetched from the User Service). Defaults to `instructor` for full representations and to nothing when `fields` is given; send it empty to skip the User Service entirely.",
+                    "schema": {"type": "string", "enum": ["instructor", ""]}
+                },
+                "Links": {
+                    "name": "links",
+                    "in": "query",
+                    "description": "How item links are rendered: `full` (a `_links` block of absolute URLs per item), `compact` (one collection-level `_templates` block of URI templates such as `/courses/{id}`) or `none` (no item links). Collection `_links` (self, next, prev) are always included.",
+                    "schema": {"type": "string", "enum": ["full", "compact", "none"], "default": "full"}
+                },
+                "IfNoneMatch": {
+                    "name": "If-None-Match",
+                    "in": "header",
+                    "description": "ETag from an earlier response; answered with 304 Not Modified while it still matches",
+                    "schema": {"type": "string"}
+                },
+                "IfModifiedSince": {
+                    "name": "If-Modified-Since",
+                    "in": "header",
+                    "description": "Last-Modified from an earlier response (ignored when If-None-Match is sent)",
+                    "schema": {"type": "string"}
+                }
+            },
+            "headers": {
+                "ETag": {"description": "Strong validator for this representation", "schema": {"type": "string"}},
+                "Last-Modified": {"description": "When the underlying rows last changed", "schema": {"type": "string"}}
+            },
+            "responses": {
+                "NotModified": {
+                    "description": "The client's copy is current (matching If-None-Match or If-Modified-Since); no body",
+                    "headers": {
+                        "ETag": {"$ref": "#/components/headers/ETag"},
+                        "Last-Modified": {"$ref": "#/components/headers/Last-Modified"}
+                    }
+                }
+            },
             "schemas": {
                 "Course": {
                     "type": "object",
@@ -40,6 +88,7 @@ def get_swagger_spec():
                         "category": {"type": "string", "description": "Course category"},
                         "rating": {"type": "number", "format": "float", "description": "Course rating (0-5)"},
                         "max_students": {"type": "integer", "description": "Maximum number of students"},
+                        "enrolled_count": {"type": "integer", "description": "Number of students enrolled"},
                         "created_at": {"type": "string", "format": "date-time", "description": "Course creation timestamp"},
                         "instructor": {
                             "type": "object",
@@ -105,10 +154,14 @@ def get_swagger_spec():
                             "properties": {
                                 "page": {"type": "integer"},
                                 "limit": {"type": "integer"},
-                                "total": {"type": "integer"},
-                                "pages": {"type": "integer"},
+                                "total": {"type": "integer", "nullable": True},
+                                "total_exact": {"type": "boolean", "nullable": True, "description": "False when `total` is a planner estimate, null when no total was requested"},
+                                "pages": {"type": "integer", "nullable": True},
                                 "has_next": {"type": "boolean"},
-                                "has_prev": {"type": "boolean"}
+                                "has_prev": {"type": "boolean"},
+                                "mode": {"type": "string", "enum": ["cursor"], "description": "Present for cursor pagination"},
+                                "next_cursor": {"type": "string", "nullable": True, "description": "Cursor for the next page (cursor mode)"},
+                                "prev_cursor": {"type": "string", "nullable": True, "description": "Cursor for the previous page (cursor mode)"}
                             }
                         },
                         "filters": {
@@ -121,6 +174,10 @@ def get_swagger_spec():
                         "_links": {
                             "type": "object",
                             "description": "HATEOAS links for pagination and operations"
+                        },
+                        "_templates": {
+                            "type": "object",
+                            "description": "Course link URI templates (`{id}`, `{instructor_id}`), present with `links=compact`"
                         }
                     }
                 },
@@ -132,10 +189,25 @@ def get_swagger_spec():
                             "items": {"$ref": "#/components/schemas/Enrollment"}
                         },
                         "student_id": {"type": "integer"},
-                        "total": {"type": "integer"},
+                        "total": {"type": "integer", "description": "Enrollments across all pages"},
+                        "pagination": {
+                            "type": "object",
+                            "properties": {
+                                "page": {"type": "integer"},
+                                "limit": {"type": "integer"},
+                                "total": {"type": "integer"},
+                                "pages": {"type": "integer"},
+                                "has_next": {"type": "boolean"},
+                                "has_prev": {"type": "boolean"}
+                            }
+                        },
                         "_links": {
                             "type": "object",
                             "description": "HATEOAS links for related operations"
+                        },
+                        "_templates": {
+                            "type": "object",
+                            "description": "Course link URI templates, present with `links=compact`"
                         }
                     }
                 },
@@ -168,7 +240,27 @@ def get_swagger_spec():
                             "description": "Breakdown of courses by category",
                             "additionalProperties": {"type": "integer"}
                         },
+                        "category_stats": {
+                            "type": "object",
+                            "description": "Courses, enrollments and average rating per category",
+                            "additionalProperties": {
+                                "type": "object",
+                                "properties": {
+                                    "courses": {"type": "integer"},
+                                    "enrollments": {"type": "integer"},
+                                    "average_rating": {"type": "number", "format": "float"}
+                                }
+                            }
+                        },
+                        "enrollments_by_status": {
+                            "type": "object",
+                            "description": "Enrollment counts per completion status",
+                            "additionalProperties": {"type": "integer"}
+                        },
                         "average_rating": {"type": "number", "format": "float", "description": "Average course rating"},
+                        "source": {"type": "string", "enum": ["rollup", "live"], "description": "Whether the numbers come from the analytics rollup or a live aggregate (empty rollup)"},
+                        "rollup_updated_at": {"type": "string", "format": "date-time", "nullable": True, "description": "When the analytics rollup last changed"},
+                        "rollup_pending_deltas": {"type": "integer", "description": "Analytics delta rows not yet folded into the rollup (already included in the numbers)"},
                         "timestamp": {"type": "string", "format": "date-time", "description": "Analytics generation timestamp"},
                         "_links": {
                             "type": "object",
@@ -202,6 +294,22 @@ def get_swagger_spec():
                     }
                 }
             },
+            "/metrics": {
+                "get": {
+                    "summary": "Prometheus metrics",
+                    "description": "Request latency histograms by endpoint, method and status, in-flight requests and database pool checkouts and User Service call latency, in the Prometheus text format (disabled with METRICS_ENABLED=false)",
+                    "responses": {
+                        "200": {
+                            "description": "Current metric values",
+                            "content": {
+                                "text/plain": {
+                                    "schema": {"type": "string"}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
             "/info": {
                 "get": {
                     "summary": "Service information",
@@ -230,7 +338,7 @@ def get_swagger_spec():
             "/api/courses": {
                 "get": {
                     "summary": "Get all courses",
-                    "description": "Retrieve courses with pagination, filtering, and sorting. Includes HATEOAS links.",
+                    "description": "Retrieve courses with pagination, filtering, and sorting. Includes HATEOAS links. Supports conditional GET (ETag / Last-Modified).",
                     "tags": ["Courses"],
                     "parameters": [
                         {
@@ -260,17 +368,39 @@ def get_swagger_spec():
                                 "enum": ["id_asc", "id_desc", "title_asc", "title_desc", "rating_asc", "rating_desc"],
                                 "default": "id_asc"
                             }
-                        }
+                        },
+                        {
+                            "name": "cursor",
+                            "in": "query",
+                            "description": "Opaque keyset pagination cursor from `next_cursor`/`prev_cursor`. Pass it empty to start cursor pagination at the first page; `page` is then ignored and the sort is taken from the cursor.",
+                            "schema": {"type": "string"}
+                        },
+                        {
+                            "name": "include_total",
+                            "in": "query",
+                            "description": "How `pagination.total` is computed: `exact` (window function on the page query; default in page mode), `estimate` (planner row estimate for unfiltered lists, exact otherwise) or `none` (skip the count; default in cursor mode)",
+                            "schema": {"type": "string", "enum": ["exact", "estimate", "none"]}
+                        },
+                        {"$ref": "#/components/parameters/Fields"},
+                        {"$ref": "#/components/parameters/Expand"},
+                        {"$ref": "#/components/parameters/Links"},
+                        {"$ref": "#/components/parameters/IfNoneMatch"},
+                        {"$ref": "#/components/parameters/IfModifiedSince"}
                     ],
                     "responses": {
                         "200": {
                             "description": "List of courses with pagination and HATEOAS links",
+                            "headers": {
+                                "ETag": {"$ref": "#/components/headers/ETag"},
+                                "Last-Modified": {"$ref": "#/components/headers/Last-Modified"}
+                            },
                             "content": {
                                 "application/json": {
                                     "schema": {"$ref": "#/components/schemas/CoursesResponse"}
                                 }
                             }
-                        }
+                        },
+                        "304": {"$ref": "#/components/responses/NotModified"}
                     }
                 },
                 "post": {
@@ -319,10 +449,126 @@ def get_swagger_spec():
                     }
                 }
             },
+            "/api/courses/import": {
+                "post": {
+                    "summary": "Import courses",
+                    "description": "Bulk-create courses from an NDJSON or CSV body (fields: title, instructor_id, description, category, rating, max_students). The body is read row by row, instructors are verified once per distinct ID and rows are inserted and committed in batches, so large catalogs import in constant memory. Rows that fail validation or name an instructor the User Service reports missing are reported and skipped; if the User Service cannot be reached, the import stops with a 503 and retry_from_line.",
+                    "tags": ["Courses"],
+                    "parameters": [
+                        {
+                            "name": "format",
+                            "in": "query",
+                            "description": "Body format; defaults to the Content-Type",
+                            "schema": {"type": "string", "enum": ["ndjson", "csv"]}
+                        },
+                        {
+                            "name": "batch_size",
+                            "in": "query",
+                            "description": "Rows per INSERT batch and commit (1-5000)",
+                            "schema": {"type": "integer", "default": 1000}
+                        }
+                    ],
+                    "requestBody": {
+                        "required": True,
+                        "content": {
+                            "application/x-ndjson": {
+                                "schema": {"type": "string"},
+                                "example": "{\"title\": \"Python 101\", \"instructor_id\": 1, \"category\": \"programming\"}\n"
+                            },
+                            "text/csv": {
+                                "schema": {"type": "string"},
+                                "example": "title,instructor_id,category\nPython 101,1,programming\n"
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Import summary",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "rows": {"type": "integer"},
+                                            "imported": {"type": "integer"},
+                                            "failed": {"type": "integer"},
+                                            "batches": {"type": "integer"},
+                                            "errors": {
+                                                "type": "array",
+                                                "description": "First 100 row errors",
+                                                "items": {
+                                                    "type": "object",
+                                                    "properties": {
+                                                        "line": {"type": "integer"},
+                                                        "error": {"type": "string"}
+                                                    }
+                                                }
+                                            },
+                                            "errors_truncated": {"type": "boolean"},
+                                            "aborted": {"type": "boolean", "description": "True when the import stopped because the User Service could not verify instructors (503)"},
+                                            "abort_reason": {"type": "string", "nullable": True},
+                                            "retry_from_line": {"type": "integer", "nullable": True, "description": "First line to send again after an abort; earlier batches were committed"}
+                                        }
+                                    }
+                                }
+                            }
+                        },
+                        "503": {
+                            "description": "User Service unavailable: import stopped before the batch it could not verify (same summary body, with aborted and retry_from_line)"
+                        },
+                        "415": {
+                            "description": "Unsupported body format",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            "/api/courses/export": {
+                "get": {
+                    "summary": "Export courses",
+                    "description": "Stream the whole course catalog as NDJSON (one course per line) or CSV. Rows are read with a server-side cursor and sent as they are fetched, so memory use does not depend on the catalog size.",
+                    "tags": ["Courses"],
+                    "parameters": [
+                        {
+                            "name": "format",
+                            "in": "query",
+                            "description": "Output format",
+                            "schema": {"type": "string", "enum": ["ndjson", "csv"], "default": "ndjson"}
+                        },
+                        {
+                            "name": "category",
+                            "in": "query",
+                            "description": "Only export courses in this category",
+                            "schema": {"type": "string"}
+                        }
+                    ],
+                    "responses": {
+                        "200": {
+                            "description": "Streamed course rows",
+                            "content": {
+                                "application/x-ndjson": {"schema": {"type": "string"}},
+                                "text/csv": {"schema": {"type": "string"}}
+                            }
+                        },
+                        "400": {
+                            "description": "Unsupported format",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
             "/api/courses/{course_id}": {
                 "get": {
                     "summary": "Get specific course",
-                    "description": "Get a specific course by ID with instructor details and HATEOAS links",
+                    "description": "Get a specific course by ID with instructor details and HATEOAS links. Supports conditional GET (ETag / Last-Modified).",
                     "tags": ["Courses"],
                     "parameters": [
                         {
@@ -331,11 +577,19 @@ def get_swagger_spec():
                             "required": True,
                             "description": "ID of the course to retrieve",
                             "schema": {"type": "integer"}
-                        }
+                        },
+                        {"$ref": "#/components/parameters/Fields"},
+                        {"$ref": "#/components/parameters/Expand"},
+                        {"$ref": "#/components/parameters/IfNoneMatch"},
+                        {"$ref": "#/components/parameters/IfModifiedSince"}
                     ],
                     "responses": {
                         "200": {
                             "description": "Course details",
+                            "headers": {
+                                "ETag": {"$ref": "#/components/headers/ETag"},
+                                "Last-Modified": {"$ref": "#/components/headers/Last-Modified"}
+                            },
                             "content": {
                                 "application/json": {
                                     "schema": {
@@ -347,6 +601,7 @@ def get_swagger_spec():
                                 }
                             }
                         },
+                        "304": {"$ref": "#/components/responses/NotModified"},
                         "404": {
                             "description": "Course not found",
                             "content": {
@@ -500,10 +755,122 @@ def get_swagger_spec():
                     }
                 }
             },
+            "/api/enrollments/bulk": {
+                "post": {
+                    "summary": "Bulk enroll students",
+                    "description": "Enroll many students in one or more courses with one request. Capacity is checked per course; when seats run out, students are admitted in the order given. Returns an outcome for every (student, course) pair.",
+                    "tags": ["Enrollments"],
+                    "requestBody": {
+                        "required": True,
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "required": ["student_ids"],
+                                    "properties": {
+                                        "student_ids": {"type": "array", "items": {"type": "integer"}, "example": [101, 102, 103]},
+                                        "course_id": {"type": "integer", "description": "Course to enroll into (or use course_ids)", "example": 1},
+                                        "course_ids": {"type": "array", "items": {"type": "integer"}, "description": "Courses to enroll every student into"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Per-row enrollment outcomes",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "results": {
+                                                "type": "array",
+                                                "items": {
+                                                    "type": "object",
+                                                    "properties": {
+                                                        "student_id": {"type": "integer"},
+                                                        "course_id": {"type": "integer"},
+                                                        "status": {"type": "string", "enum": ["enrolled", "already_enrolled", "course_full", "course_not_found"]},
+                                                        "enrollment_id": {"type": "integer", "nullable": True}
+                                                    }
+                                                }
+                                            },
+                                            "summary": {"type": "object", "description": "Number of rows per status"},
+                                            "total": {"type": "integer"}
+                                        }
+                                    }
+                                }
+                            }
+                        },
+                        "400": {
+                            "description": "Invalid request or more than 5000 (student, course) pairs",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            "/api/enrollments/export": {
+                "get": {
+                    "summary": "Export enrollments",
+                    "description": "Stream all enrollments as NDJSON or CSV using a server-side cursor. Requires valid API key.",
+                    "tags": ["Enrollments"],
+                    "parameters": [
+                        {
+                            "name": "apiKey",
+                            "in": "query",
+                            "required": True,
+                            "description": "API key for authentication",
+                            "schema": {"type": "string"}
+                        },
+                        {
+                            "name": "format",
+                            "in": "query",
+                            "description": "Output format",
+                            "schema": {"type": "string", "enum": ["ndjson", "csv"], "default": "ndjson"}
+                        },
+                        {
+                            "name": "course_id",
+                            "in": "query",
+                            "description": "Only export enrollments for this course",
+                            "schema": {"type": "integer"}
+                        }
+                    ],
+                    "responses": {
+                        "200": {
+                            "description": "Streamed enrollment rows",
+                            "content": {
+                                "application/x-ndjson": {"schema": {"type": "string"}},
+                                "text/csv": {"schema": {"type": "string"}}
+                            }
+                        },
+                        "400": {
+                            "description": "Unsupported format",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        },
+                        "401": {
+                            "description": "Invalid or missing API key",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
             "/api/enrollments/student/{student_id}": {
                 "get": {
                     "summary": "Get student enrollments",
-                    "description": "Get all enrollments for a specific student with course details and HATEOAS links",
+                    "description": "Get a page of enrollments for a specific student with course details and HATEOAS links",
                     "tags": ["Enrollments"],
                     "parameters": [
                         {
@@ -512,7 +879,22 @@ def get_swagger_spec():
                             "required": True,
                             "description": "ID of the student",
                             "schema": {"type": "integer"}
-                        }
+                        },
+                        {
+                            "name": "page",
+                            "in": "query",
+                            "description": "Page number",
+                            "schema": {"type": "integer", "default": 1}
+                        },
+                        {
+                            "name": "limit",
+                            "in": "query",
+                            "description": "Enrollments per page (max 100)",
+                            "schema": {"type": "integer", "default": 50}
+                        },
+                        {"$ref": "#/components/parameters/Fields"},
+                        {"$ref": "#/components/parameters/Expand"},
+                        {"$ref": "#/components/parameters/Links"}
                     ],
                     "responses": {
                         "200": {
@@ -546,7 +928,7 @@ def get_swagger_spec():
             "/api/analytics": {
                 "get": {
                     "summary": "Get analytics data",
-                    "description": "Get analytics data about courses and enrollments. Requires valid API key.",
+                    "description": "Get analytics data about courses and enrollments, read from an incrementally maintained per-category rollup. Responses are cached for ANALYTICS_CACHE_TTL seconds and then served stale for up to ANALYTICS_CACHE_MAX_STALE seconds while one background refresh runs. Requires valid API key.",
                     "tags": ["Analytics"],
                     "security": [{"ApiKeyAuth": []}],
                     "parameters": [
@@ -562,6 +944,10 @@ def get_swagger_spec():
                     "responses": {
                         "200": {
                             "description": "Analytics data retrieved successfully",
+                            "headers": {
+                                "Age": {"description": "Seconds since the payload was computed", "schema": {"type": "integer"}},
+                                "X-Cache": {"description": "HIT, STALE (refresh in progress) or MISS", "schema": {"type": "string", "enum": ["HIT", "STALE", "MISS"]}}
+                            },
                             "content": {
                                 "application/json": {
                                     "schema": {"$ref": "#/components/schemas/AnalyticsResponse"}
@@ -578,6 +964,104 @@ def get_swagger_spec():
                         }
                     }
                 }
+            },
+            "/api/analytics/rollup": {
+                "post": {
+                    "summary": "Rebuild analytics rollup",
+                    "description": "Recompute the per-category analytics rollup from courses and enrollments. Only needed after writes that bypassed the Course Service. Requires valid API key.",
+                    "tags": ["Operations"],
+                    "security": [{"ApiKeyAuth": []}],
+                    "responses": {
+                        "200": {"description": "Rollup rebuilt; returns the number of categories"},
+                        "401": {
+                            "description": "Invalid or missing API key",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            "/api/instructor-cache": {
+                "get": {
+                    "summary": "Get instructor cache statistics",
+                    "description": "Size, configuration and hit/miss/eviction counters of the process-local instructor cache. Requires valid API key.",
+                    "tags": ["Operations"],
+                    "security": [{"ApiKeyAuth": []}],
+                    "responses": {
+                        "200": {"description": "Cache statistics"},
+                        "401": {
+                            "description": "Invalid or missing API key",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        }
+                    }
+                },
+                "delete": {
+                    "summary": "Invalidate cached instructors",
+                    "description": "Drop specific instructors (`?ids=1,2`) or the whole cache (`?all=true`). Requires valid API key.",
+                    "tags": ["Operations"],
+                    "security": [{"ApiKeyAuth": []}],
+                    "parameters": [
+                        {
+                            "name": "ids",
+                            "in": "query",
+                            "required": False,
+                            "description": "Comma-separated instructor IDs to invalidate",
+                            "schema": {"type": "string"}
+                        },
+                        {
+                            "name": "all",
+                            "in": "query",
+                            "required": False,
+                            "description": "Set to true to clear the whole cache",
+                            "schema": {"type": "boolean"}
+                        }
+                    ],
+                    "responses": {
+                        "200": {"description": "Entries invalidated"},
+                        "400": {
+                            "description": "No IDs given or malformed IDs",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        },
+                        "401": {
+                            "description": "Invalid or missing API key",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            "/api/user-service-client": {
+                "get": {
+                    "summary": "Get User Service client statistics",
+                    "description": "Request, failure and retry counters plus latency percentiles for Course Service calls to the User Service. Requires valid API key.",
+                    "tags": ["Operations"],
+                    "security": [{"ApiKeyAuth": []}],
+                    "responses": {
+                        "200": {"description": "Client statistics"},
+                        "401": {
+                            "description": "Invalid or missing API key",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
+                        }
+                    }
+                }
             }
         },
         "tags": [
@@ -596,6 +1080,14 @@ def get_swagger_spec():
             {
                 "name": "Analytics",
                 "description": "Analytics data with API key authentication"
+            },
+            {
+                "name": "Operations",
+                "description": "Operational endpoints for caches and runtime state (API key required)"
             }
         ]
-    }
\ No newline at end of file
+    }
+
+
+# /swagger.json view: built and serialized once, served with ETag, gzip and 304s
+swagger_spec_response = cached_spec_response(get_swagger_spec)
@@ -0,0 +1,231 @@
+"""
+HTTP client for Course Service -> User Service calls
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.course_service.circuit_breaker import CircuitBreaker, CircuitOpenError
+from middleware.metrics import metrics
+from middleware.request_timing import add_timing
+
+# Upstream statuses worth retrying on an idempotent GET
+RETRYABLE_STATUSES = {502, 503, 504}
+
+metrics.histogram('user_service_request_duration_seconds',
+                  'Latency of each User Service call attempt, by outcome', ('outcome',))
+
+
+class UserServiceClient:
+    """Pooled, keep-alive client for the User Service.
+
+    All calls share one ``requests.Session`` so TCP connections (and DNS
+    lookups) are reused across requests. Every call has connect/read timeouts,
+    GETs are retried a bounded number of times with jittered exponential
+    backoff, and each attempt's latency is recorded for ``stats()``. Attempts
+    go through a circuit breaker, so a degraded User Service is failed fast
+    with ``CircuitOpenError`` instead of being waited on.
+    """
+
+    def __init__(self, base_url, pool_connections=4, pool_maxsize=20,
+                 connect_timeout=0.5, read_timeout=2.0,
+                 max_retries=2, backoff_base=0.05, backoff_max=1.0,
+                 fanout_workers=None, fanout_concurrency=8, fanout_deadline=2.5, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Fan-out workers default to the pool size so every worker can hold a connection
+        self.fanout_workers = fanout_workers or pool_maxsize
+        self.fanout_concurrency = fanout_concurrency
+        self.fanout_deadline = fanout_deadline
+        self._executor = None
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1024)
+        self._counters = {'requests': 0, 'failures': 0, 'retries': 0, 'deadline_exceeded': 0,
+                          'total_seconds': 0.0, 'max_seconds': 0.0}
+
+    @classmethod
+    def from_env(cls):
+        """Build a client configured from USER_SERVICE_* environment variables"""
+        return cls(
+            base_url=os.getenv('USER_SERVICE_URL', 'http://localhost:5002'),
+            pool_connections=int(os.getenv('USER_SERVICE_POOL_CONNECTIONS', 4)),
+            pool_maxsize=int(os.getenv('USER_SERVICE_POOL_MAXSIZE', 20)),
+            connect_timeout=float(os.getenv('USER_SERVICE_CONNECT_TIMEOUT', 0.5)),
+            read_timeout=float(os.getenv('USER_SERVICE_READ_TIMEOUT', 2.0)),
+            max_retries=int(os.getenv('USER_SERVICE_MAX_RETRIES', 2)),
+            backoff_base=float(os.getenv('USER_SERVICE_BACKOFF', 0.05)),
+            fanout_workers=int(os.getenv('USER_SERVICE_FANOUT_WORKERS', 0)) or None,
+            fanout_concurrency=int(os.getenv('USER_SERVICE_FANOUT_CONCURRENCY', 8)),
+            fanout_deadline=float(os.getenv('USER_SERVICE_FANOUT_DEADLINE', 2.5)),
+            breaker=CircuitBreaker.from_env()
+        )
+
+    def get(self, path, params=None):
+        """GET ``path`` on the User Service, retrying transient failures.
+
+        Returns the final ``requests.Response`` (which may still be a 5xx) or
+        raises the last ``requests.RequestException`` once retries run out.
+        Raises ``CircuitOpenError`` without calling out while the circuit is open.
+        """
+        started = time.perf_counter()
+        try:
+            return self._get(path, params)
+        finally:
+            # Wall-clock time the request waited, retries and backoff included
+            add_timing('upstream', time.perf_counter() - started)
+
+    def _get(self, path, params=None):
+        url = f"{self.base_url}{path}"
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._increment('retries')
+                time.sleep(self._backoff(attempt))
+
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(f"Circuit open for {self.base_url}")
+
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                elapsed = time.perf_counter() - started
+                self._record(elapsed, failed=True)
+                self.breaker.record(failed=True, seconds=elapsed)
+                retryable = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                if not retryable or attempt == self.max_retries:
+                    raise
+                continue
+
+            elapsed = time.perf_counter() - started
+            failed = response.status_code >= 500
+            self._record(elapsed, failed=failed)
+            self.breaker.record(failed=failed, seconds=elapsed)
+            if response.status_code not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                return response
+
+    def get_concurrently(self, paths, max_concurrency=None, deadline=None):
+        """GET several independent paths in parallel on the shared worker pool.
+
+        At most ``max_concurrency`` requests from this call are in flight at
+        once, and the whole fan-out is bounded by ``deadline`` seconds. Returns
+        ``{path: response_or_exception}``; paths that did not finish before the
+        deadline are left out.
+        """
+        started = time.perf_counter()
+        try:
+            return self._get_concurrently(paths, max_concurrency, deadline)
+        finally:
+            # Workers run outside the request context, so the fan-out counts once
+            add_timing('upstream', time.perf_counter() - started)
+
+    def _get_concurrently(self, paths, max_concurrency, deadline):
+        max_concurrency = max(1, max_concurrency or self.fanout_concurrency)
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.fanout_deadline)
+        executor = self._get_executor()
+
+        queued = deque(dict.fromkeys(paths))
+        in_flight = {}
+        results = {}
+
+        while queued or in_flight:
+            while queued and len(in_flight) < max_concurrency:
+                path = queued.popleft()
+                in_flight[executor.submit(self.get, path)] = path
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+
+            done, _ = wait(in_flight, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = in_flight.pop(future)
+                try:
+                    results[path] = future.result()
+                except requests.RequestException as e:
+                    results[path] = e
+
+        # Deadline reached: abandon whatever is still queued or running
+        for future in in_flight:
+            future.cancel()
+        if in_flight or queued:
+            self._increment('deadline_exceeded')
+
+        return results
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.fanout_workers,
+                                                    thread_name_prefix='user-service-fanout')
+            return self._executor
+
+    def _backoff(self, attempt):
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _increment(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _record(self, seconds, failed):
+        metrics.observe('user_service_request_duration_seconds', seconds, 'error' if failed else 'ok')
+        with self._lock:
+            self._counters['requests'] += 1
+            self._counters['total_seconds'] += seconds
+            self._counters['max_seconds'] = max(self._counters['max_seconds'], seconds)
+            if failed:
+                self._counters['failures'] += 1
+            self._latencies.append(seconds)
+
+    def stats(self):
+        """Request/failure/retry counters and latency percentiles over recent calls"""
+        with self._lock:
+            stats = dict(self._counters)
+            latencies = sorted(self._latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 2)
+
+        stats['avg_ms'] = round(stats['total_seconds'] / stats['requests'] * 1000, 2) if stats['requests'] else 0.0
+        stats['max_ms'] = round(stats.pop('max_seconds') * 1000, 2)
+        stats['total_seconds'] = round(stats['total_seconds'], 4)
+        stats['p50_ms'] = percentile(0.50)
+        stats['p95_ms'] = percentile(0.95)
+        stats['p99_ms'] = percentile(0.99)
+        stats['base_url'] = self.base_url
+        stats['pool_maxsize'] = self.pool_maxsize
+        stats['timeout_seconds'] = {'connect': self.timeout[0], 'read': self.timeout[1]}
+        stats['max_retries'] = self.max_retries
+        stats['fanout'] = {
+            'workers': self.fanout_workers,
+            'max_concurrency': self.fanout_concurrency,
+            'deadline_seconds': self.fanout_deadline
+        }
+        stats['circuit_breaker'] = self.breaker.stats()
+        return stats
+
+
+# Shared client used by the course routes
+user_client = UserServiceClient.from_env()
@@ -0,0 +1,59 @@
+"""
+ETag / Last-Modified validators and conditional GET handling for read endpoints
+"""
+
+import hashlib
+from datetime import timezone
+
+from flask import current_app, request
+
+from middleware.table_versions import table_version
+from models.database import db, TableVersion
+
+
+def make_etag(*parts):
+    """Strong ETag value (unquoted) for a representation identified by ``parts`` and the request URL"""
+    digest = hashlib.sha1(repr((request.url,) + parts).encode())
+    return digest.hexdigest()
+
+
+def user_table_version():
+    """``(version, last_modified)`` of the users table, from one primary-key read.
+
+    Every flush that writes users bumps the ``table_versions`` row, so this
+    never scans ``users``. ``(0, None)`` until the first write.
+    """
+    return table_version(db.session, TableVersion.__table__, 'users')
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response if the request's validators still match, otherwise None.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since``, as in
+    RFC 9110; the latter compares at whole-second precision.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = _http_time(last_modified) <= request.if_modified_since
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified=None):
+    """Set ``ETag``, ``Last-Modified`` and ``Cache-Control: no-cache`` on ``response``"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_time(last_modified)
+    # Caches may store the response but must revalidate before reusing it
+    response.cache_control.no_cache = True
+    return response
+
+
+def _http_time(value):
+    """Stored UTC timestamps as aware datetimes truncated to HTTP-date precision"""
+    return value.replace(microsecond=0, tzinfo=timezone.utc)
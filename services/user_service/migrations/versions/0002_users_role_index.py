@@ -0,0 +1,30 @@
+"""Index users by role
+
+Revision ID: 0002_users_role_index
+Revises: 0001_baseline
+Create Date: 2026-10-17 09:10:00.000000
+
+Built with CREATE INDEX CONCURRENTLY (outside a transaction) so this can be
+applied to a live database without blocking writes. If the build fails,
+PostgreSQL leaves an INVALID index behind: drop it and upgrade again.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_users_role_index'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_role', 'users', ['role'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_role', table_name='users',
+                      postgresql_concurrently=True, if_exists=True)
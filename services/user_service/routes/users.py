@@ -1,14 +1,50 @@
 from flask import Blueprint, request, jsonify
 from models.database import db, User
+from conditional import make_etag, not_modified, user_table_version, with_validators
 
 users_bp = Blueprint('users', __name__)
 
+# Upper bound on IDs accepted by the batch lookup endpoint
+MAX_BATCH_IDS = 500
+
 @users_bp.route('/users', methods=['GET'])
 def get_users():
     """Get all users"""
+    # Conditional GET: answer 304 from the table's change version instead of loading every user
+    version, last_modified = user_table_version()
+    validators = (make_etag('users', version, last_modified), last_modified)
+    unchanged = not_modified(*validators)
+    if unchanged:
+        return unchanged
+    
     users = User.query.all()
+    return with_validators(jsonify({
+        'users': [user.to_dict() for user in users],
+        'total': len(users)
+    }), *validators)
+
+@users_bp.route('/users/batch', methods=['GET'])
+def get_users_batch():
+    """Get many users by ID in a single query (?ids=1,2,3)"""
+    raw_ids = request.args.get('ids', '')
+    
+    try:
+        user_ids = sorted({int(value) for value in raw_ids.split(',') if value.strip()})
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+    
+    if not user_ids:
+        return jsonify({'error': 'At least one id is required'}), 400
+    
+    if len(user_ids) > MAX_BATCH_IDS:
+        return jsonify({'error': f'At most {MAX_BATCH_IDS} ids may be requested at once'}), 400
+    
+    users = User.query.filter(User.id.in_(user_ids)).all()
+    found_ids = {user.id for user in users}
+    
     return jsonify({
         'users': [user.to_dict() for user in users],
+        'missing': [user_id for user_id in user_ids if user_id not in found_ids],
         'total': len(users)
     })
 
@@ -16,7 +52,13 @@ def get_users():
 def get_user(user_id):
     """Get a specific user by ID"""
     user = User.query.get_or_404(user_id)
-    return jsonify({'user': user.to_dict()})
+    
+    validators = (make_etag('user', user.id, user.updated_at), user.updated_at)
+    unchanged = not_modified(*validators)
+    if unchanged:
+        return unchanged
+    
+    return with_validators(jsonify({'user': user.to_dict()}), *validators)
 
 @users_bp.route('/users/by-role/<role>', methods=['GET'])
 def get_users_by_role(role):
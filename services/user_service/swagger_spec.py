@@ -2,6 +2,9 @@
 OpenAPI specification for User Service
 """
 
+from middleware.spec_cache import cached_spec_response
+
+
 def get_swagger_spec():
     """Returns the OpenAPI specification for User Service"""
     return {
@@ -44,6 +47,33 @@ def get_swagger_spec():
                     "description": "Session-based authentication"
                 }
             },
+            "parameters": {
+                "IfNoneMatch": {
+                    "name": "If-None-Match",
+                    "in": "header",
+                    "description": "ETag from an earlier response; answered with 304 Not Modified while it still matches",
+                    "schema": {"type": "string"}
+                },
+                "IfModifiedSince": {
+                    "name": "If-Modified-Since",
+                    "in": "header",
+                    "description": "Last-Modified from an earlier response (ignored when If-None-Match is sent)",
+                    "schema": {"type": "string"}
+                }
+            },
+            "headers": {
+                "ETag": {"description": "Strong validator for this representation", "schema": {"type": "string"}},
+                "Last-Modified": {"description": "When the underlying rows last changed", "schema": {"type": "string"}}
+            },
+            "responses": {
+                "NotModified": {
+                    "description": "The client's copy is current (matching If-None-Match or If-Modified-Since); no body",
+                    "headers": {
+                        "ETag": {"$ref": "#/components/headers/ETag"},
+                        "Last-Modified": {"$ref": "#/components/headers/Last-Modified"}
+                    }
+                }
+            },
             "schemas": {
                 "User": {
                     "type": "object",
@@ -111,6 +141,22 @@ def get_swagger_spec():
                     }
                 }
             },
+            "/metrics": {
+                "get": {
+                    "summary": "Prometheus metrics",
+                    "description": "Request latency histograms by endpoint, method and status, in-flight requests and database pool checkouts, in the Prometheus text format (disabled with METRICS_ENABLED=false)",
+                    "responses": {
+                        "200": {
+                            "description": "Current metric values",
+                            "content": {
+                                "text/plain": {
+                                    "schema": {"type": "string"}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
             "/info": {
                 "get": {
                     "summary": "Service information",
@@ -294,16 +340,73 @@ def get_swagger_spec():
             "/api/users": {
                 "get": {
                     "summary": "Get all users",
-                    "description": "Retrieve a list of all users in the system",
+                    "description": "Retrieve a list of all users in the system. Supports conditional GET (ETag / Last-Modified).",
                     "tags": ["Users"],
+                    "parameters": [
+                        {"$ref": "#/components/parameters/IfNoneMatch"},
+                        {"$ref": "#/components/parameters/IfModifiedSince"}
+                    ],
                     "responses": {
                         "200": {
                             "description": "List of users",
+                            "headers": {
+                                "ETag": {"$ref": "#/components/headers/ETag"},
+                                "Last-Modified": {"$ref": "#/components/headers/Last-Modified"}
+                            },
                             "content": {
                                 "application/json": {
                                     "schema": {"$ref": "#/components/schemas/UserList"}
                                 }
                             }
+                        },
+                        "304": {"$ref": "#/components/responses/NotModified"}
+                    }
+                }
+            },
+            "/api/users/batch": {
+                "get": {
+                    "summary": "Get many users by ID",
+                    "description": "Resolve up to 500 users in a single query. IDs that do not exist are reported in `missing`.",
+                    "tags": ["Users"],
+                    "parameters": [
+                        {
+                            "name": "ids",
+                            "in": "query",
+                            "required": True,
+                            "description": "Comma-separated list of user IDs",
+                            "schema": {"type": "string", "example": "1,2,3"}
+                        }
+                    ],
+                    "responses": {
+                        "200": {
+                            "description": "Users found for the requested IDs",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "users": {
+                                                "type": "array",
+                                                "items": {"$ref": "#/components/schemas/User"}
+                                            },
+                                            "missing": {
+                                                "type": "array",
+                                                "items": {"type": "integer"},
+                                                "description": "Requested IDs that do not exist"
+                                            },
+                                            "total": {"type": "integer", "description": "Number of users found"}
+                                        }
+                                    }
+                                }
+                            }
+                        },
+                        "400": {
+                            "description": "Missing, malformed or too many IDs",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Error"}
+                                }
+                            }
                         }
                     }
                 }
@@ -311,7 +414,7 @@ def get_swagger_spec():
             "/api/users/{user_id}": {
                 "get": {
                     "summary": "Get specific user",
-                    "description": "Get a specific user by their ID",
+                    "description": "Get a specific user by their ID. Supports conditional GET (ETag / Last-Modified).",
                     "tags": ["Users"],
                     "parameters": [
                         {
@@ -320,11 +423,17 @@ def get_swagger_spec():
                             "required": True,
                             "description": "ID of the user to retrieve",
                             "schema": {"type": "integer"}
-                        }
+                        },
+                        {"$ref": "#/components/parameters/IfNoneMatch"},
+                        {"$ref": "#/components/parameters/IfModifiedSince"}
                     ],
                     "responses": {
                         "200": {
                             "description": "User details",
+                            "headers": {
+                                "ETag": {"$ref": "#/components/headers/ETag"},
+                                "Last-Modified": {"$ref": "#/components/headers/Last-Modified"}
+                            },
                             "content": {
                                 "application/json": {
                                     "schema": {
@@ -336,6 +445,7 @@ def get_swagger_spec():
                                 }
                             }
                         },
+                        "304": {"$ref": "#/components/responses/NotModified"},
                         "404": {
                             "description": "User not found",
                             "content": {
@@ -484,4 +594,8 @@ def get_swagger_spec():
                 "description": "User management and role-based operations"
             }
         ]
-    }
\ No newline at end of file
+    }
+
+
+# /swagger.json view: built and serialized once, served with ETag, gzip and 304s
+swagger_spec_response = cached_spec_response(get_swagger_spec)
@@ -0,0 +1,1111 @@
+#!/usr/bin/env python3
+"""
+In-process tests for the Course Service routes.
+Runs the courses blueprint against an in-memory SQLite database with the
+User Service replaced by a fake, so no running services are required.
+"""
+
+import gzip
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+import pytest
+import requests
+from flask import Flask, request
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from middleware import json_provider, profiling, request_timing
+from middleware.access_log import AccessLog, parse_sample_rates
+from middleware.json_provider import FastJSONProvider
+from middleware.metrics import Metrics, metrics as shared_metrics
+from middleware.response_cache import ResponseCache
+from middleware.spec_cache import SWAGGER_CACHE_MAX_AGE, cached_spec_response
+from services.course_service.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.course_service.instructor_cache import InstructorCache
+from services.course_service.models.database import db, Course, Enrollment
+from services.course_service.pagination import order_by_clauses
+from services.course_service.routes import courses as courses_module
+from services.course_service.routes.courses import courses_bp
+from services.course_service import analytics as analytics_module
+from services.course_service import streaming
+from services.course_service.user_client import UserServiceClient
+
+INSTRUCTORS = {
+    1: {'id': 1, 'name': 'John Doe', 'email': 'john.doe@example.com', 'role': 'teacher'},
+    2: {'id': 2, 'name': 'Jane Smith', 'email': 'jane.smith@example.com', 'role': 'teacher'},
+}
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class FakeUserService:
+    """Stands in for the User Service and records every call made to it"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, path, params=None):
+        self.calls.append((path, params))
+        if path == '/api/users/batch':
+            ids = [int(value) for value in params['ids'].split(',')]
+            users = [INSTRUCTORS[user_id] for user_id in ids if user_id in INSTRUCTORS]
+            return FakeResponse(200, {'users': users, 'total': len(users)})
+        user_id = int(path.rsplit('/', 1)[1])
+        if user_id in INSTRUCTORS:
+            return FakeResponse(200, {'user': INSTRUCTORS[user_id]})
+        return FakeResponse(404, {'error': 'Not found'})
+
+    def get_concurrently(self, paths, max_concurrency=None, deadline=None):
+        return {path: self.get(path) for path in paths}
+
+
+@pytest.fixture
+def user_service(monkeypatch):
+    fake = FakeUserService()
+    monkeypatch.setattr(courses_module, 'user_client', fake)
+    return fake
+
+
+@pytest.fixture
+def app(monkeypatch):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(courses_bp, url_prefix='/api')
+
+    # Every test starts with an empty instructor cache and uncached analytics
+    monkeypatch.setattr(courses_module, 'instructor_cache', InstructorCache())
+    monkeypatch.setattr(courses_module, 'analytics_cache', ResponseCache(ttl=0))
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def seed_courses(count, instructor_ids=(1, 2, 99)):
+    """Create `count` courses cycling through the given instructor IDs"""
+    courses = [
+        Course(
+            title=f'Course {index:03d}',
+            instructor_id=instructor_ids[index % len(instructor_ids)],
+            category='tech' if index % 2 else 'arts',
+            rating=float(index % 5)
+        )
+        for index in range(count)
+    ]
+    db.session.add_all(courses)
+    db.session.commit()
+    return courses
+
+
+def test_course_list_fetches_instructors_in_one_call(app, user_service):
+    """A page of courses resolves all instructors with a single batch request"""
+    seed_courses(30)
+
+    response = app.test_client().get('/api/courses?limit=30')
+
+    assert response.status_code == 200
+    assert len(user_service.calls) == 1
+    path, params = user_service.calls[0]
+    assert path == '/api/users/batch'
+    assert params == {'ids': '1,2,99'}
+
+    courses = response.get_json()['courses']
+    assert courses[0]['instructor']['name'] == 'John Doe'
+    assert courses[2]['instructor'] == {'id': 99, 'name': 'Unknown Instructor'}
+
+
+def test_student_enrollments_fetch_instructors_in_one_call(app, user_service):
+    """Enrollment listings resolve instructors once per distinct ID"""
+    courses = seed_courses(6)
+    db.session.add_all([Enrollment(student_id=7, course_id=course.id) for course in courses])
+    db.session.commit()
+
+    response = app.test_client().get('/api/enrollments/student/7')
+
+    assert response.status_code == 200
+    assert len(user_service.calls) == 1
+    assert len(response.get_json()['enrollments']) == 6
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_instructor_cache_lru_ttl_and_negative_entries():
+    """The cache evicts least recently used entries and honours both TTLs"""
+    clock = FakeClock()
+    cache = InstructorCache(max_size=2, ttl=10, negative_ttl=2, clock=clock)
+
+    cache.store(1, INSTRUCTORS[1])
+    cache.store(2, INSTRUCTORS[2])
+    assert cache.lookup(1) == (True, INSTRUCTORS[1])  # 1 is now most recently used
+    cache.store_missing(99)                            # evicts 2
+
+    assert cache.lookup(2) == (False, None)
+    assert cache.lookup(99) == (True, None)
+
+    clock.now = 5
+    assert cache.lookup(99) == (False, None)           # negative entry expired
+    assert cache.lookup(1) == (True, INSTRUCTORS[1])
+
+    assert cache.invalidate([1, 2]) == 1
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['expirations'] == 1
+    assert stats['invalidations'] == 1
+    assert stats['size'] == 0
+
+
+def test_repeat_course_list_is_served_from_instructor_cache(app, user_service):
+    """Known and unknown instructors are cached after the first page load"""
+    seed_courses(9)
+    client = app.test_client()
+
+    client.get('/api/courses')
+    response = client.get('/api/courses')
+
+    assert len(user_service.calls) == 1
+    assert response.get_json()['courses'][2]['instructor']['name'] == 'Unknown Instructor'
+
+    stats = client.get('/api/instructor-cache?apiKey=validKey').get_json()['instructor_cache']
+    assert stats['hits'] == 2
+    assert stats['negative_hits'] == 1
+
+    client.delete('/api/instructor-cache?ids=1&apiKey=validKey')
+    client.get('/api/courses')
+    assert user_service.calls[-1][1] == {'ids': '1'}
+
+
+class FlakySession:
+    """Session stub that fails a fixed number of times before answering"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, timeout))
+        if len(self.calls) <= self.failures:
+            raise requests.ConnectionError('connection refused')
+        return FakeResponse(200, {'user': INSTRUCTORS[1]})
+
+
+def test_user_client_retries_with_timeouts():
+    """Transient connection errors are retried within the retry budget"""
+    client = UserServiceClient('http://users:5002/', connect_timeout=0.1, read_timeout=0.2,
+                               max_retries=2, backoff_base=0)
+    client.session = FlakySession(failures=2)
+
+    response = client.get('/api/users/1')
+
+    assert response.status_code == 200
+    assert client.session.calls[0] == ('http://users:5002/api/users/1', (0.1, 0.2))
+    stats = client.stats()
+    assert stats['requests'] == 3
+    assert stats['failures'] == 2
+    assert stats['retries'] == 2
+
+    client.session = FlakySession(failures=5)
+    with pytest.raises(requests.ConnectionError):
+        client.get('/api/users/1')
+    assert len(client.session.calls) == 3
+
+
+class SlowSession:
+    """Session stub where every call takes `delay` seconds"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        user_id = int(url.rsplit('/', 1)[1])
+        return FakeResponse(200, {'user': {'id': user_id, 'name': f'User {user_id}'}})
+
+
+def test_user_client_fans_out_with_concurrency_cap_and_deadline():
+    """Concurrent lookups respect the per-request cap and the overall deadline"""
+    client = UserServiceClient('http://users:5002', fanout_workers=8)
+    client.session = SlowSession(delay=0.05)
+    paths = [f'/api/users/{user_id}' for user_id in range(8)]
+
+    started = time.perf_counter()
+    results = client.get_concurrently(paths, max_concurrency=4, deadline=5)
+    elapsed = time.perf_counter() - started
+
+    assert sorted(results) == sorted(paths)
+    assert client.session.peak_in_flight == 4
+    assert elapsed < 0.05 * 8  # two waves of four, not eight serial calls
+
+    client.session = SlowSession(delay=0.5)
+    results = client.get_concurrently(paths, max_concurrency=8, deadline=0.05)
+    assert results == {}
+    assert client.stats()['deadline_exceeded'] == 1
+
+
+def test_concurrent_lookup_mode_resolves_single_users(app, user_service, monkeypatch):
+    """In concurrent mode each instructor is fetched individually, once"""
+    monkeypatch.setattr(courses_module, 'INSTRUCTOR_LOOKUP_MODE', 'concurrent')
+    seed_courses(9)
+
+    response = app.test_client().get('/api/courses')
+
+    assert sorted(path for path, _ in user_service.calls) == ['/api/users/1', '/api/users/2', '/api/users/99']
+    assert response.get_json()['courses'][1]['instructor']['name'] == 'Jane Smith'
+
+
+def test_circuit_breaker_opens_probes_and_closes():
+    """The breaker trips on error rate, rejects while open and closes after good probes"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_rate_threshold=0.5, window_size=4, min_calls=4,
+                             open_seconds=10, half_open_calls=2, clock=clock)
+
+    for failed in (False, True, False, True):
+        assert breaker.allow_request()
+        breaker.record(failed=failed, seconds=0.01)
+    assert breaker.state == 'open'
+    assert not breaker.allow_request()
+
+    clock.now = 10
+    assert breaker.state == 'half_open'
+    assert breaker.allow_request() and breaker.allow_request()
+    assert not breaker.allow_request()  # only two probes at a time
+    breaker.record(failed=False, seconds=0.01)
+    breaker.record(failed=False, seconds=0.01)
+
+    stats = breaker.stats()
+    assert stats['state'] == 'closed'
+    assert stats['rejected_calls'] == 2
+    assert stats['transitions'] == {'closed->open': 1, 'open->half_open': 1, 'half_open->closed': 1}
+
+
+def test_circuit_breaker_trips_on_slow_calls():
+    """A window of slow (but successful) calls also opens the circuit"""
+    breaker = CircuitBreaker(slow_call_seconds=0.5, slow_call_rate_threshold=0.5, window_size=2, min_calls=2)
+
+    breaker.record(failed=False, seconds=0.9)
+    breaker.record(failed=False, seconds=0.9)
+
+    assert breaker.state == 'open'
+
+
+def test_open_circuit_serves_stale_instructors_without_calling_out(app, monkeypatch):
+    """While the circuit is open, expired cache entries and placeholders are served immediately"""
+    clock = FakeClock()
+    cache = InstructorCache(ttl=10, clock=clock)
+    cache.store(1, INSTRUCTORS[1])
+    clock.now = 60  # entry expired
+    monkeypatch.setattr(courses_module, 'instructor_cache', cache)
+
+    client = UserServiceClient('http://users:5002', breaker=CircuitBreaker(min_calls=1, window_size=1))
+    client.session = FlakySession(failures=100)
+    monkeypatch.setattr(courses_module, 'user_client', client)
+    seed_courses(2)
+
+    with pytest.raises(CircuitOpenError):
+        client.get('/api/users/1')  # first attempt trips the breaker, the retry is rejected
+    calls_before = len(client.session.calls)
+
+    response = app.test_client().get('/api/courses')
+    instructors = [course['instructor'] for course in response.get_json()['courses']]
+
+    assert len(client.session.calls) == calls_before
+    assert instructors == [INSTRUCTORS[1], {'id': 2, 'name': 'Unknown Instructor'}]
+    assert cache.stats()['stale_hits'] == 1
+    with pytest.raises(CircuitOpenError):
+        client.get('/api/users/1')
+
+
+@pytest.mark.parametrize('sort', ['id_asc', 'id_desc', 'title_asc', 'title_desc', 'rating_asc', 'rating_desc'])
+def test_cursor_pagination_walks_every_sort_forwards_and_backwards(app, user_service, sort):
+    """Following next/prev cursors visits every course exactly once, in sort order"""
+    courses = seed_courses(23)
+    for course in courses[::4]:
+        course.rating = None  # NULL ratings must not break the keyset
+    db.session.commit()
+    client = app.test_client()
+
+    expected = [course.id for course in Course.query.order_by(*order_by_clauses(sort))]
+
+    seen, pages = [], []
+    url = f'/api/courses?cursor=&limit=5&sort={sort}'
+    while url:
+        data = client.get(url).get_json()
+        pages.append(data)
+        seen.extend(course['id'] for course in data['courses'])
+        url = data['_links'].get('next', {}).get('href')
+    assert seen == expected
+    assert len(pages) == 5
+    assert pages[0]['pagination']['has_prev'] is False
+
+    backwards = []
+    url = pages[-1]['_links']['prev']['href']
+    while url:
+        data = client.get(url).get_json()
+        backwards = [course['id'] for course in data['courses']] + backwards
+        url = data['_links'].get('prev', {}).get('href')
+    assert backwards == expected[:20]
+
+
+def test_cursor_pagination_filters_and_rejects_bad_cursors(app, user_service):
+    """The category filter is applied and carried in links; malformed cursors are 400s"""
+    seed_courses(10)
+    client = app.test_client()
+
+    data = client.get('/api/courses?cursor=&limit=3&category=tech').get_json()
+    assert [course['category'] for course in data['courses']] == ['tech'] * 3
+    assert 'category=tech' in data['_links']['next']['href']
+
+    statements = capture_statements()
+    data = client.get(data['_links']['next']['href']).get_json()
+    assert len(data['courses']) == 2
+    assert data['pagination']['has_next'] is False
+    # Page N costs one keyset query: no COUNT/MAX over courses, not even for validators
+    course_selects = [statement for statement in statements if 'FROM courses' in statement]
+    assert len(course_selects) == 1
+    assert 'count(' not in course_selects[0].lower() and 'max(' not in course_selects[0].lower()
+
+    assert client.get('/api/courses?cursor=not-a-cursor').status_code == 400
+
+
+def capture_statements():
+    """Record every SQL statement sent to the test database"""
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_course_totals_come_from_the_page_query_or_are_skipped(app, user_service):
+    """Exact totals use a window function on the page query; include_total=none skips them"""
+    seed_courses(12)
+    client = app.test_client()
+    statements = capture_statements()
+
+    data = client.get('/api/courses?page=2&limit=5&category=tech').get_json()
+    # Only the page query reads courses (the conditional-GET validator does not)
+    course_selects = [statement for statement in statements if 'FROM courses' in statement]
+    assert len(course_selects) == 1
+    assert 'OVER ()' in course_selects[0]
+    assert data['pagination']['total'] == 6
+    assert data['pagination']['total_exact'] is True
+    assert data['pagination']['pages'] == 2
+    assert data['pagination']['has_next'] is False
+
+    statements.clear()
+    data = client.get('/api/courses?page=2&limit=5&include_total=none').get_json()
+    assert not [statement for statement in statements if 'count(' in statement.lower() and 'courses' in statement]
+    assert len([statement for statement in statements if 'FROM courses' in statement]) == 1
+    assert data['pagination']['total'] is None
+    assert data['pagination']['has_next'] is True
+    assert 'include_total=none' in data['_links']['next']['href']
+
+    data = client.get('/api/courses?page=9&limit=5').get_json()
+    assert data['courses'] == []
+    assert data['pagination']['total'] == 12
+
+    # Estimates are PostgreSQL-only; elsewhere they fall back to exact counts
+    data = client.get('/api/courses?include_total=estimate').get_json()
+    assert data['pagination']['total'] == 12
+    assert data['pagination']['total_exact'] is True
+
+    assert client.get('/api/courses?include_total=maybe').status_code == 400
+
+
+def test_enrollment_claims_seats_atomically_without_counting(app, user_service):
+    """Enrollment uses the seat counter: no COUNT(*), duplicates and full courses rejected"""
+    course = Course(title='Small', instructor_id=1, max_students=2)
+    db.session.add(course)
+    db.session.commit()
+    client = app.test_client()
+    statements = capture_statements()
+
+    response = client.post(f'/api/courses/{course.id}/enroll', json={'student_id': 1})
+    assert response.status_code == 201
+    assert response.get_json()['enrollment']['student_id'] == 1
+    assert not any('count(' in statement.lower() for statement in statements)
+    assert any('ON CONFLICT' in statement and 'DO NOTHING' in statement for statement in statements)
+
+    response = client.post(f'/api/courses/{course.id}/enroll', json={'student_id': 1})
+    assert response.status_code == 400
+    assert 'already enrolled' in response.get_json()['error']
+
+    assert client.post(f'/api/courses/{course.id}/enroll', json={'student_id': 2}).status_code == 201
+    response = client.post(f'/api/courses/{course.id}/enroll', json={'student_id': 3})
+    assert response.status_code == 400
+    assert 'capacity' in response.get_json()['error']
+
+    # Already enrolled is reported ahead of capacity, and rejected attempts leave the counter alone
+    response = client.post(f'/api/courses/{course.id}/enroll', json={'student_id': 2})
+    assert 'already enrolled' in response.get_json()['error']
+    db.session.expire_all()
+    assert db.session.get(Course, course.id).enrolled_count == 2
+    assert Enrollment.query.filter_by(course_id=course.id).count() == 2
+
+    assert client.post('/api/courses/999/enroll', json={'student_id': 1}).status_code == 404
+    assert client.post(f'/api/courses/{course.id}/enroll', json={'student_id': 'x'}).status_code == 400
+
+
+def test_bulk_enrollment_is_set_based_with_per_row_outcomes(app, user_service):
+    """A roster is enrolled with a fixed number of statements and reports every row"""
+    small = Course(title='Small', instructor_id=1, max_students=3)
+    large = Course(title='Large', instructor_id=2, max_students=1000)
+    db.session.add_all([small, large])
+    db.session.commit()
+    db.session.add(Enrollment(student_id=1, course_id=small.id))
+    small.enrolled_count = 1
+    db.session.commit()
+    small_id, large_id = small.id, large.id
+    client = app.test_client()
+    statements = capture_statements()
+
+    roster = list(range(1, 501))
+    response = client.post('/api/enrollments/bulk', json={'course_ids': [small_id, large_id, 999],
+                                                          'student_ids': roster})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['total'] == 1500
+    assert data['summary'] == {'enrolled': 502, 'already_enrolled': 1, 'course_full': 497, 'course_not_found': 500}
+    small_results = [result for result in data['results'] if result['course_id'] == small_id]
+    assert [result['status'] for result in small_results[:4]] == ['already_enrolled', 'enrolled', 'enrolled', 'course_full']
+    assert small_results[1]['enrollment_id'] is not None
+    assert len([statement for statement in statements if statement.startswith('INSERT INTO enrollments')]) == 1
+    assert len(statements) <= 6
+
+    db.session.expire_all()
+    assert db.session.get(Course, small_id).enrolled_count == 3
+    assert db.session.get(Course, large_id).enrolled_count == 500
+    assert Enrollment.query.count() == 503
+
+    # Re-sending the roster is idempotent
+    data = client.post('/api/enrollments/bulk', json={'course_id': large_id, 'student_ids': roster}).get_json()
+    assert data['summary']['already_enrolled'] == 500
+
+    assert client.post('/api/enrollments/bulk', json={'student_ids': [1]}).status_code == 400
+    assert client.post('/api/enrollments/bulk', json={'course_id': 1, 'student_ids': []}).status_code == 400
+    assert client.post('/api/enrollments/bulk', json={'course_id': 1, 'student_ids': ['a']}).status_code == 400
+
+
+def test_course_import_streams_rows_in_batches(app, user_service):
+    """NDJSON/CSV imports verify each instructor once and insert multi-row batches"""
+    lines = [json.dumps({'title': f'Imported {index}', 'instructor_id': 1 + index % 2, 'rating': 4.5})
+             for index in range(7)]
+    lines[3] = json.dumps({'title': 'Ghost', 'instructor_id': 99})
+    lines.insert(5, '{not json')
+    lines.append(json.dumps({'instructor_id': 1}))
+    body = '\n'.join(lines) + '\n'
+    client = app.test_client()
+    statements = capture_statements()
+
+    response = client.post('/api/courses/import?batch_size=3', data=body, content_type='application/x-ndjson')
+
+    assert response.status_code == 200
+    summary = response.get_json()
+    assert summary['rows'] == 9
+    assert summary['imported'] == 6
+    assert summary['failed'] == 3
+    errors = {error['line']: error['error'] for error in summary['errors']}
+    assert sorted(errors) == [4, 6, 9]
+    assert errors[4] == 'Instructor 99 not found'
+    # Each distinct instructor is verified once, in bulk
+    verified = [params['ids'] for _, params in user_service.calls]
+    assert verified == ['1,2', '99']
+    inserts = [statement for statement in statements if statement.startswith('INSERT INTO courses')]
+    assert len(inserts) == summary['batches'] == 3
+    assert Course.query.filter(Course.title.like('Imported %')).count() == 6
+
+    csv_body = 'title,instructor_id,category,max_students\nCSV One,2,data,30\nCSV Two,x,,\n'
+    summary = client.post('/api/courses/import', data=csv_body, content_type='text/csv').get_json()
+    assert summary['imported'] == 1
+    assert summary['errors'] == [{'line': 3, 'error': 'instructor_id must be an integer'}]
+    assert Course.query.filter_by(title='CSV One').one().max_students == 30
+
+    assert client.post('/api/courses/import', data='x', content_type='text/plain').status_code == 415
+
+
+def test_course_import_stops_when_instructors_cannot_be_verified(app, user_service, monkeypatch):
+    """An outage aborts the import with a 503 instead of reporting rows as unknown instructors"""
+    def unavailable(path, params=None):
+        if '2' in params['ids'].split(','):
+            raise requests.ConnectionError('User Service down')
+        return FakeUserService.get(user_service, path, params)
+    monkeypatch.setattr(user_service, 'get', unavailable)
+    lines = [json.dumps({'title': f'Imported {index}', 'instructor_id': instructor_id})
+             for index, instructor_id in enumerate([1, 99, 1, 2, 1])]
+    client = app.test_client()
+
+    response = client.post('/api/courses/import?batch_size=3', data='\n'.join(lines) + '\n',
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 503
+    summary = response.get_json()
+    assert summary['aborted'] is True
+    assert 'User Service unavailable' in summary['abort_reason']
+    # The first batch went in; the one that could not be verified is left whole for a retry
+    assert summary['imported'] == 2
+    assert summary['errors'] == [{'line': 2, 'error': 'Instructor 99 not found'}]
+    assert summary['retry_from_line'] == 4
+    assert Course.query.count() == 2
+
+
+def test_exports_stream_courses_and_enrollments(app, user_service):
+    """Exports stream plain rows chunk by chunk as NDJSON or CSV"""
+    courses = seed_courses(5)
+    db.session.add_all([Enrollment(student_id=7, course_id=course.id) for course in courses[:3]])
+    db.session.commit()
+    client = app.test_client()
+
+    response = client.get('/api/courses/export')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['title'] for row in rows] == [f'Course {index:03d}' for index in range(5)]
+    assert rows[0]['created_at'].startswith(str(courses[0].created_at.year))
+
+    response = client.get('/api/courses/export?format=csv&category=tech')
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith('id,title,description,instructor_id,category')
+    assert len(lines) == 3
+    assert 'attachment; filename=courses.csv' == response.headers['Content-Disposition']
+
+    # Chunks are emitted as rows are fetched, header first
+    with app.test_request_context():
+        statement = db.select(Course.__table__).order_by(Course.id)
+        chunks = list(streaming.export_rows(statement, 'csv', chunk_rows=2))
+    assert len(chunks) == 4
+    assert chunks[0].startswith('id,') and chunks[0].count('\n') == 1
+
+    assert client.get('/api/enrollments/export').status_code == 401
+    response = client.get(f'/api/enrollments/export?apiKey=validKey&course_id={courses[0].id}')
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row['student_id'], row['course_id']) for row in rows] == [(7, courses[0].id)]
+
+    assert client.get('/api/courses/export?format=xml').status_code == 400
+
+
+def test_student_enrollments_load_courses_in_one_query_and_paginate(app, user_service):
+    """Enrollments and their courses come from one joined query, one page at a time"""
+    courses = seed_courses(12)
+    db.session.add_all([Enrollment(student_id=7, course_id=course.id) for course in courses])
+    db.session.commit()
+    db.session.expire_all()
+    client = app.test_client()
+    statements = capture_statements()
+
+    data = client.get('/api/enrollments/student/7?limit=5&page=2').get_json()
+
+    assert len(statements) == 1
+    assert 'JOIN courses' in statements[0]
+    assert 'OVER ()' in statements[0]
+    assert [enrollment['course_id'] for enrollment in data['enrollments']] == [course.id for course in courses[5:10]]
+    assert data['total'] == 12
+    assert data['pagination']['pages'] == 3
+    assert data['_links']['next']['href'].endswith('?page=3&limit=5')
+    assert data['_links']['prev']['href'].endswith('?page=1&limit=5')
+    assert len(user_service.calls) == 1
+
+    data = client.get('/api/enrollments/student/7?page=9&limit=5').get_json()
+    assert data['enrollments'] == [] and data['total'] == 12
+
+
+def test_analytics_aggregates_in_one_query(app, user_service):
+    """Analytics come from a single grouped query, not from loading every course"""
+    courses = seed_courses(6)
+    courses[0].category = None
+    courses[1].rating = None
+    statuses = ['enrolled', 'completed', 'completed', 'dropped']
+    db.session.add_all([Enrollment(student_id=index, course_id=courses[index % 2].id, completion_status=status)
+                        for index, status in enumerate(statuses)])
+    db.session.commit()
+    client = app.test_client()
+    statements = capture_statements()
+
+    data = client.get('/api/analytics?apiKey=validKey').get_json()
+
+    # Rows written behind the service's back: the empty rollup falls back to the live query
+    assert data['source'] == 'live'
+    assert len(statements) == 3
+    assert 'course_analytics_deltas' in statements[1]
+    assert 'GROUP BY' in statements[2]
+    assert data['total_courses'] == 6
+    assert data['total_enrollments'] == 4
+    assert data['course_categories'] == {'uncategorized': 1, 'arts': 2, 'tech': 3}
+    assert data['average_rating'] == 1.8
+    assert data['enrollments_by_status'] == {'enrolled': 1, 'in_progress': 0, 'completed': 2, 'dropped': 1}
+    assert data['category_stats']['tech'] == {'courses': 3, 'enrollments': 2, 'average_rating': 1.5}
+    assert data['category_stats']['uncategorized']['enrollments'] == 2
+
+
+def test_analytics_rollup_tracks_every_write_path(app, user_service):
+    """The rollup is adjusted by each write and always matches a full recompute"""
+    client = app.test_client()
+
+    def rollup_matches_live():
+        data = client.get('/api/analytics?apiKey=validKey').get_json()
+        assert data['source'] == 'rollup'
+        live = analytics_module.summarize(analytics_module.category_aggregates())
+        assert {key: data[key] for key in live} == live
+        return data
+
+    course_id = client.post('/api/courses', json={'title': 'A', 'instructor_id': 1, 'category': 'tech'}).get_json()['course']['id']
+    other_id = client.post('/api/courses', json={'title': 'B', 'instructor_id': 2}).get_json()['course']['id']
+    data = rollup_matches_live()
+    assert data['course_categories'] == {'tech': 1, 'general': 1}
+    assert data['rollup_updated_at'] is not None
+
+    client.post(f'/api/courses/{course_id}/enroll', json={'student_id': 1})
+    client.post('/api/enrollments/bulk', json={'course_ids': [course_id, other_id], 'student_ids': [2, 3]})
+    client.post('/api/courses/import', data='{"title": "C", "instructor_id": 1, "category": "art", "rating": 4}\n',
+                content_type='application/x-ndjson')
+    assert rollup_matches_live()['total_enrollments'] == 5
+
+    client.put(f'/api/courses/{course_id}', json={'category': 'art', 'rating': 5})
+    data = rollup_matches_live()
+    assert data['category_stats']['art'] == {'courses': 2, 'enrollments': 3, 'average_rating': 4.5}
+
+    client.delete(f'/api/courses/{course_id}')
+    data = rollup_matches_live()
+    assert data['total_courses'] == 2 and data['total_enrollments'] == 2
+
+    # A full rebuild reproduces the incrementally maintained numbers
+    response = client.post('/api/analytics/rollup?apiKey=validKey')
+    assert response.status_code == 200
+    assert rollup_matches_live()['category_stats'] == data['category_stats']
+
+
+def test_analytics_writes_append_deltas_folded_later(app, user_service):
+    """Writes never touch the shared rollup rows; folding moves their deltas in without changing the numbers"""
+    client = app.test_client()
+    course_id = client.post('/api/courses', json={'title': 'A', 'instructor_id': 1, 'category': 'tech'}).get_json()['course']['id']
+    analytics_module.fold_rollup_deltas()
+    statements = capture_statements()
+
+    client.post(f'/api/courses/{course_id}/enroll', json={'student_id': 1})
+    client.post('/api/enrollments/bulk', json={'course_ids': [course_id], 'student_ids': [2, 3]})
+
+    assert not [statement for statement in statements if 'course_analytics_rollup' in statement]
+    assert any(statement.startswith('INSERT INTO course_analytics_deltas') for statement in statements)
+    before = client.get('/api/analytics?apiKey=validKey').get_json()
+    assert before['total_enrollments'] == 3
+    assert before['rollup_pending_deltas'] == 2
+
+    assert analytics_module.fold_rollup_deltas(batch_size=1) == 2
+    assert analytics_module.fold_rollup_deltas() == 0
+    after = client.get('/api/analytics?apiKey=validKey').get_json()
+    assert after['rollup_pending_deltas'] == 0
+    volatile = ('rollup_pending_deltas', 'timestamp')
+    assert {key: after[key] for key in after if key not in volatile} == \
+        {key: before[key] for key in before if key not in volatile}
+
+
+def test_rollup_folder_survives_failed_folds(app, monkeypatch, capsys):
+    """Any exception from a fold is logged and retried; the folder thread keeps running"""
+    folds = []
+
+    def flaky_fold(batch_size):
+        folds.append(batch_size)
+        if len(folds) == 1:
+            raise RuntimeError('boom')
+        return 0
+    monkeypatch.setattr(analytics_module, 'fold_rollup_deltas', flaky_fold)
+    folder = analytics_module.RollupFolder(interval=0.01, batch_size=7).init_app(app)
+
+    folder._ensure_started()
+    try:
+        deadline = time.monotonic() + 5
+        while len(folds) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert len(folds) >= 3
+        assert folder._thread.is_alive()
+    finally:
+        folder.close()
+    assert "RuntimeError('boom')" in capsys.readouterr().err
+
+
+def test_analytics_cache_serves_stale_while_one_refresh_runs(app, user_service, monkeypatch):
+    """Expired analytics are served stale while a single background refresh recomputes them"""
+    clock = FakeClock()
+    refreshes = []
+    cache = ResponseCache(ttl=5, max_stale=60, clock=clock, spawn=refreshes.append)
+    monkeypatch.setattr(courses_module, 'analytics_cache', cache)
+    seed_courses(3)
+    client = app.test_client()
+
+    response = client.get('/api/analytics?apiKey=validKey')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.headers['Age'] == '0'
+
+    seed_courses(2)
+    clock.now = 3
+    response = client.get('/api/analytics?apiKey=validKey')
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.headers['Age'] == '3'
+    assert response.get_json()['total_courses'] == 3
+
+    # A herd of requests after expiry: all served stale, one refresh scheduled
+    clock.now = 10
+    for _ in range(5):
+        response = client.get('/api/analytics?apiKey=validKey')
+        assert response.headers['X-Cache'] == 'STALE'
+        assert response.get_json()['total_courses'] == 3
+    assert len(refreshes) == 1
+
+    refreshes[0]()
+    response = client.get('/api/analytics?apiKey=validKey')
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.get_json()['total_courses'] == 5
+
+    # Past the stale window the value is recomputed inline
+    clock.now = 100
+    assert client.get('/api/analytics?apiKey=validKey').headers['X-Cache'] == 'MISS'
+
+
+def test_course_reads_revalidate_without_enrichment(app, user_service):
+    """Matching validators get a 304 without calling the User Service; writes change the ETag"""
+    courses = seed_courses(4)
+    course_id = courses[0].id
+    client = app.test_client()
+
+    for path in (f'/api/courses/{course_id}', '/api/courses?limit=2', '/api/courses?cursor=&category=tech'):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'no-cache'
+        etag = response.headers['ETag']
+
+        user_service.calls.clear()
+        unchanged = client.get(path, headers={'If-None-Match': etag})
+        assert unchanged.status_code == 304
+        assert unchanged.headers['ETag'] == etag
+        assert user_service.calls == []
+
+        modified_since = client.get(path, headers={'If-Modified-Since': response.headers['Last-Modified']})
+        assert modified_since.status_code == 304
+
+    paths = (f'/api/courses/{course_id}', f'/api/courses/{courses[1].id}', '/api/courses?limit=2')
+    etags = {path: client.get(path).headers['ETag'] for path in paths}
+
+    # Enrolling changes the course (its seat counter) and the list; other courses are untouched
+    assert client.post(f'/api/courses/{course_id}/enroll', json={'student_id': 7}).status_code == 201
+    assert client.get(paths[0], headers={'If-None-Match': etags[paths[0]]}).status_code == 200
+    assert client.get(paths[1], headers={'If-None-Match': etags[paths[1]]}).status_code == 304
+    assert client.get(paths[2], headers={'If-None-Match': etags[paths[2]]}).status_code == 200
+
+    # Deleting a course changes the list validators
+    etag = client.get(paths[2]).headers['ETag']
+    assert client.delete(f'/api/courses/{courses[3].id}').status_code == 200
+    assert client.get(paths[2], headers={'If-None-Match': etag}).status_code == 200
+
+    # So do edits that leave the analytics counters alone (and, harmlessly, rollup folds)
+    etag = client.get(paths[2]).headers['ETag']
+    assert client.put(f'/api/courses/{course_id}', json={'title': 'Renamed'}).status_code == 200
+    assert client.get(paths[2], headers={'If-None-Match': etag}).status_code == 200
+    etag = client.get(paths[2]).headers['ETag']
+    analytics_module.fold_rollup_deltas()
+    assert client.get(paths[2]).headers['ETag'] != etag
+
+
+def test_course_lists_render_links_full_compact_or_none(app, user_service):
+    """links=compact sends one _templates block, links=none drops item links, and both shrink the page"""
+    seed_courses(30)
+    client = app.test_client()
+
+    full = client.get('/api/courses?limit=20')
+    course = full.get_json()['courses'][0]
+    assert course['_links']['enroll'] == {'href': f"http://localhost/courses/{course['id']}/enroll", 'method': 'POST'}
+    assert course['_links']['instructor']['href'].endswith(f"/api/users/{course['instructor_id']}")
+    assert '_templates' not in full.get_json()
+
+    compact = client.get('/api/courses?limit=20&links=compact')
+    data = compact.get_json()
+    assert all('_links' not in course for course in data['courses'])
+    assert data['_templates']['enroll'] == {
+        'href': 'http://localhost/courses/{id}/enroll', 'method': 'POST', 'templated': True
+    }
+    assert 'links=compact' in data['_links']['next']['href']
+
+    none = client.get('/api/courses?cursor=&limit=20&links=none')
+    data = none.get_json()
+    assert all('_links' not in course for course in data['courses'])
+    assert '_templates' not in data
+    assert 'links=none' in data['_links']['next']['href']
+
+    assert len(none.data) < len(compact.data) < len(full.data) * 0.6
+    assert client.get('/api/courses?links=some').status_code == 400
+
+    for index in range(3):
+        db.session.add(Enrollment(student_id=5, course_id=index + 1))
+    db.session.commit()
+    data = client.get('/api/enrollments/student/5?links=compact').get_json()
+    assert all('_links' not in enrollment and '_links' not in enrollment['course']
+               for enrollment in data['enrollments'])
+    assert data['_templates']['self']['href'] == 'http://localhost/courses/{id}'
+    full = client.get('/api/enrollments/student/5').get_json()
+    assert full['enrollments'][0]['_links']['course']['href'] == 'http://localhost/courses/1'
+    assert full['enrollments'][0]['course']['_links']['self']['href'] == 'http://localhost/courses/1'
+
+
+def test_sparse_fieldsets_select_columns_and_skip_enrichment(app, user_service):
+    """fields= narrows the SELECT and the output; the instructor is only fetched with expand=instructor"""
+    courses = seed_courses(6)
+    client = app.test_client()
+    statements = capture_statements()
+
+    data = client.get('/api/courses?limit=2&fields=title,rating&links=none').get_json()
+    assert [sorted(course) for course in data['courses']] == [['id', 'rating', 'title']] * 2
+    assert user_service.calls == []
+    page_query = next(statement for statement in statements if 'OVER ()' in statement)
+    assert 'courses.description' not in page_query and 'courses.created_at' not in page_query
+    assert 'fields=title%2Crating' in data['_links']['next']['href']
+
+    data = client.get('/api/courses?cursor=&limit=2&sort=title_desc&fields=title&expand=instructor').get_json()
+    course = data['courses'][0]
+    assert set(course) == {'id', 'title', 'instructor', '_links'}
+    assert course['instructor']['name'] in ('John Doe', 'Jane Smith', 'Unknown Instructor')
+    assert len(user_service.calls) == 1
+    assert 'expand=instructor' in data['_links']['next']['href']
+
+    # Full representations keep the instructor unless expansion is switched off
+    assert 'instructor' in client.get(f'/api/courses/{courses[0].id}').get_json()['course']
+    detail = client.get(f'/api/courses/{courses[0].id}?expand=').get_json()['course']
+    assert 'instructor' not in detail and 'description' in detail
+    detail = client.get(f'/api/courses/{courses[0].id}?fields=category').get_json()['course']
+    assert set(detail) == {'id', 'category', '_links'}
+
+    db.session.add(Enrollment(student_id=5, course_id=courses[0].id))
+    db.session.commit()
+    user_service.calls.clear()
+    data = client.get('/api/enrollments/student/5?fields=title&links=none').get_json()
+    assert data['enrollments'][0]['course'] == {'id': courses[0].id, 'title': 'Course 000'}
+    assert user_service.calls == []
+
+    assert client.get('/api/courses?fields=title,secret').status_code == 400
+    assert client.get('/api/courses/1?expand=students').status_code == 400
+
+
+def test_json_provider_writes_model_datetimes_as_iso8601(app, user_service, monkeypatch):
+    """Models return datetimes; the provider writes ISO 8601 with or without orjson"""
+    course = seed_courses(1)[0]
+    client = app.test_client()
+
+    fast = client.get(f'/api/courses/{course.id}')
+    assert fast.get_json()['course']['created_at'] == course.created_at.isoformat()
+
+    monkeypatch.setattr(json_provider, 'orjson', None)
+    fallback = client.get(f'/api/courses/{course.id}')
+    assert fallback.data == fast.data
+    assert app.json.loads(fallback.data) == app.json.loads(fast.data.decode())
+
+
+def test_swagger_spec_is_serialized_once_and_cached():
+    """/swagger.json is served from bytes built once, with a content ETag, gzip and 304s"""
+    from services.course_service.swagger_spec import get_swagger_spec
+
+    builds = []
+    spec_response = cached_spec_response(lambda: builds.append(1) or get_swagger_spec())
+
+    app = Flask(__name__)
+    app.add_url_rule('/swagger.json', 'swagger_spec', spec_response)
+    client = app.test_client()
+
+    plain = client.get('/swagger.json', headers={'Accept-Encoding': 'identity'})
+    assert json.loads(plain.data) == get_swagger_spec()
+    assert plain.headers['Cache-Control'] == f'public, max-age={SWAGGER_CACHE_MAX_AGE}'
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    compressed = client.get('/swagger.json', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+
+    unchanged = client.get('/swagger.json', headers={'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']})
+    assert unchanged.status_code == 304
+    assert unchanged.data == b''
+    assert len(builds) == 1
+
+
+def test_access_log_writes_sampled_json_lines_in_batches(app, monkeypatch):
+    """Requests are logged as JSON with DB and upstream time; sampling never hides 5xx"""
+    client = UserServiceClient('http://users:5002')
+    client.session = FlakySession(failures=0)
+    monkeypatch.setattr(courses_module, 'user_client', client)
+    seed_courses(3)
+
+    app.add_url_rule('/health', 'health', lambda: ('', int(request.args.get('status', 200))))
+    stream = io.StringIO()
+    access_log = AccessLog('course-service', stream=stream,
+                           sample_rates=parse_sample_rates('/health=0,/api/analytics*=0.5')).init_app(app)
+    assert access_log.sample_rate('/api/analytics/refresh') == 0.5
+    assert access_log.sample_rate('/api/courses') == 1.0
+
+    http = app.test_client()
+    http.get('/api/courses')
+    http.get('/health')
+    http.get('/health?status=503')
+    access_log.close()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(record['method'], record['path'], record['status']) for record in records] == [
+        ('GET', '/api/courses', 200), ('GET', '/health', 503)
+    ]
+    courses = records[0]
+    assert courses['service'] == 'course-service'
+    assert courses['db_queries'] >= 1 and courses['db_ms'] > 0
+    assert courses['upstream_calls'] == 1
+    assert courses['duration_ms'] >= courses['db_ms'] + courses['upstream_ms']
+    assert records[1]['db_queries'] == 0 and records[1]['upstream_calls'] == 0
+
+    stats = access_log.stats()
+    assert stats['sampled_out'] == 1
+    assert stats['written'] == 2 and stats['dropped'] == 0
+
+
+def test_metrics_endpoint_exposes_latency_histograms_in_prometheus_format(app, monkeypatch):
+    """Per-endpoint histograms, in-flight requests, pool checkouts and upstream latency at /metrics"""
+    client = UserServiceClient('http://users:5002', backoff_base=0)
+    client.session = FlakySession(failures=1)
+    monkeypatch.setattr(courses_module, 'user_client', client)
+    seed_courses(2)
+
+    registry = Metrics().init_app(app)
+    http = app.test_client()
+    http.get('/api/courses')
+    http.get('/api/courses')
+    http.get('/api/courses/9999')
+    http.get('/no-such-path')
+
+    response = http.get('/metrics')
+    text = response.get_data(as_text=True)
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert 'http_request_duration_seconds_count{endpoint="courses.get_courses",method="GET",status="200"} 2' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="courses.get_courses",method="GET",status="200",le="+Inf"} 2' in text
+    assert 'http_request_duration_seconds_count{endpoint="courses.get_course",method="GET",status="404"} 1' in text
+    assert 'endpoint="unmatched",method="GET",status="404"' in text
+    assert 'http_requests_in_flight 1\n' in text  # the scrape itself
+    assert '# TYPE db_pool_checkouts_total counter' in text
+    assert 'db_pool_checkouts_total ' in text
+
+    # Shards of finished threads are folded in, not lost or kept forever
+    worker = threading.Thread(target=registry.observe,
+                              args=('http_request_duration_seconds', 0.2, 'bg', 'GET', '200'))
+    worker.start()
+    worker.join()
+    assert 'http_request_duration_seconds_sum{endpoint="bg",method="GET",status="200"} 0.2' in registry.render()
+    assert all(thread.is_alive() for thread, _ in registry._shards)
+
+    # Upstream calls record into the shared registry, one sample per attempt
+    upstream = shared_metrics.render()
+    assert 'user_service_request_duration_seconds_bucket{outcome="error",le="+Inf"}' in upstream
+    assert 'user_service_request_duration_seconds_bucket{outcome="ok",le="+Inf"}' in upstream
+
+
+def test_query_instrumentation_reports_server_timing_slow_queries_and_repeats(app, user_service, monkeypatch, capsys):
+    """Per-request query count and DB time go to Server-Timing; slow and repeated statements are logged"""
+    request_timing.init_request_timing(app)
+    seed_courses(5)
+
+    @app.route('/n-plus-one')
+    def n_plus_one():
+        return {'enrolled': [Enrollment.query.filter_by(course_id=course.id).count() for course in Course.query.all()]}
+
+    http = app.test_client()
+    response = http.get('/api/courses?expand=')
+    server_timing = response.headers['Server-Timing']
+    assert server_timing.startswith('db;dur=')
+    assert 'queries"' in server_timing
+    assert 'total;dur=' in server_timing
+    assert capsys.readouterr().err == ''
+
+    monkeypatch.setattr(request_timing, 'QUERY_REPEAT_THRESHOLD', 3)
+    http.get('/n-plus-one')
+    warnings = capsys.readouterr().err
+    assert warnings.count('Possible N+1 on GET /n-plus-one') == 1
+    assert 'more than 3 times' in warnings
+
+    monkeypatch.setattr(request_timing, 'SLOW_QUERY_MS', 0)
+    http.get('/api/courses?category=arts&expand=')
+    slow = capsys.readouterr().err
+    assert 'ms) on GET /api/courses: SELECT' in slow
+    assert "params=('arts'," in slow
+
+
+def test_profiling_runs_only_for_admin_requests_when_enabled(app, user_service, monkeypatch, tmp_path, capsys):
+    """Disabled or keyless adds no hooks; enabled, key holders get a top-N report or a saved .pstats file"""
+    hooks = len(app.before_request_funcs.get(None, []))
+    profiling.init_profiling(app)
+    assert len(app.before_request_funcs.get(None, [])) == hooks
+
+    # Enabled without a dedicated key: refused, not opened to everyone
+    monkeypatch.setattr(profiling, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(profiling, 'PROFILING_API_KEY', None)
+    profiling.init_profiling(app)
+    assert len(app.before_request_funcs.get(None, [])) == hooks
+    assert 'PROFILING_API_KEY is not' in capsys.readouterr().err
+
+    monkeypatch.setattr(profiling, 'PROFILING_API_KEY', 'profile-secret')
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, 'PROFILE_TOP_N', 15)
+    monkeypatch.setattr(profiling, 'PROFILE_MAX_FILES', 2)
+    profiling.init_profiling(app)
+    seed_courses(3)
+    http = app.test_client()
+    key = {'X-Profiling-Key': 'profile-secret'}
+
+    assert 'courses' in http.get('/api/courses?profile=top').get_json()
+    # The public analytics key is not a profiling key
+    assert 'courses' in http.get('/api/courses?profile=top&apiKey=validKey').get_json()
+    assert 'courses' in http.get('/api/courses?profile=top', headers={'X-Profiling-Key': 'wrong'}).get_json()
+
+    report = http.get('/api/courses?profile=top', headers=key).get_json()['profile']
+    assert report['path'] == '/api/courses?profile=top'
+    assert report['status'] == 200
+    assert len(report['functions']) == 15
+    cumulative = [function['cumulative_ms'] for function in report['functions']]
+    assert cumulative == sorted(cumulative, reverse=True)
+    assert 'get_courses' in [function['function'] for function in report['functions']]
+
+    saved = http.get('/api/courses', headers={'X-Profile': 'save', 'X-Request-ID': 'req-42', **key})
+    assert 'courses' in saved.get_json()
+    assert saved.headers['X-Profile-File'] == 'req-42.pstats'
+    assert pstats.Stats(str(tmp_path / 'req-42.pstats')).total_calls > 0
+
+    unsafe = http.get('/api/courses?profile=save', headers={'X-Request-ID': '../../etc/x', **key})
+    assert '/' not in unsafe.headers['X-Profile-File']
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(['req-42.pstats', unsafe.headers['X-Profile-File']])
+
+    # Beyond PROFILE_MAX_FILES the oldest profiles are deleted
+    os.utime(tmp_path / 'req-42.pstats', (0, 0))
+    http.get('/api/courses?profile=save', headers={'X-Request-ID': 'req-43', **key})
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(['req-43.pstats', unsafe.headers['X-Profile-File']])
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+In-process tests for the User Service routes.
+Runs the users blueprint against an in-memory SQLite database.
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from middleware.json_provider import FastJSONProvider
+from middleware.table_versions import bump_table_version, table_version
+
+user_service_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'services', 'user_service')
+
+
+def load_service_module(name, relative_path):
+    """Load a User Service module by path under a unique name"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(user_service_dir, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # The routes import `models.database`; point that name at the User Service models
+    database = load_service_module('user_service_models_database', os.path.join('models', 'database.py'))
+    monkeypatch.setitem(sys.modules, 'models.database', database)
+    monkeypatch.setitem(sys.modules, 'conditional', load_service_module('user_service_conditional', 'conditional.py'))
+    users = load_service_module('user_service_routes_users', os.path.join('routes', 'users.py'))
+
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    database.db.init_app(app)
+    app.register_blueprint(users.users_bp, url_prefix='/api')
+
+    with app.app_context():
+        database.db.create_all()
+        for index in range(1, 4):
+            database.db.session.add(database.User(
+                email=f'user{index}@example.com',
+                google_id=f'google-{index}',
+                name=f'User {index}',
+                role='teacher'
+            ))
+        database.db.session.commit()
+        yield app
+        database.db.session.remove()
+        database.db.drop_all()
+
+
+def test_batch_lookup_returns_found_and_missing(app):
+    """The batch endpoint resolves known IDs and reports unknown ones"""
+    response = app.test_client().get('/api/users/batch?ids=3,1,42,1')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert sorted(user['id'] for user in data['users']) == [1, 3]
+    assert data['missing'] == [42]
+    assert data['total'] == 2
+
+
+def test_batch_lookup_rejects_bad_ids(app):
+    """Malformed or empty ID lists are rejected"""
+    client = app.test_client()
+
+    assert client.get('/api/users/batch?ids=1,abc').status_code == 400
+    assert client.get('/api/users/batch').status_code == 400
+
+
+def test_user_reads_revalidate_with_etags(app):
+    """User detail and list answer 304 while unchanged and 200 once a user changes"""
+    client = app.test_client()
+
+    for path in ('/api/users/1', '/api/users'):
+        response = client.get(path)
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert response.headers['Last-Modified']
+
+        unchanged = client.get(path, headers={'If-None-Match': etag})
+        assert unchanged.status_code == 304
+        assert unchanged.data == b''
+        assert unchanged.headers['ETag'] == etag
+
+        modified_since = client.get(path, headers={'If-Modified-Since': response.headers['Last-Modified']})
+        assert modified_since.status_code == 304
+
+    etags = {path: client.get(path).headers['ETag'] for path in ('/api/users/1', '/api/users', '/api/users/2')}
+    assert client.put('/api/users/1/role', json={'role': 'admin'}).status_code == 200
+
+    assert client.get('/api/users/1', headers={'If-None-Match': etags['/api/users/1']}).status_code == 200
+    assert client.get('/api/users', headers={'If-None-Match': etags['/api/users']}).status_code == 200
+    assert client.get('/api/users/2', headers={'If-None-Match': etags['/api/users/2']}).status_code == 304
+
+    # Revalidating the list reads the table version row, never the users table
+    statements = []
+    event.listen(sys.modules['models.database'].db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    etag = client.get('/api/users').headers['ETag']
+    statements.clear()
+    assert client.get('/api/users', headers={'If-None-Match': etag}).status_code == 304
+    assert len(statements) == 1
+    assert 'FROM table_versions' in statements[0] and 'FROM users' not in statements[0]
+
+
+def test_user_writes_upsert_the_table_version_row(app):
+    """The first write creates the users version row and later writes (from any app) bump it"""
+    database = sys.modules['models.database']
+    db, table = database.db, database.TableVersion.__table__
+    db.session.execute(table.delete())
+    db.session.commit()
+    assert table_version(db.session, table, 'users') == (0, None)
+
+    db.session.add(database.User(email='new@example.com', google_id='google-new', name='New'))
+    db.session.commit()
+    assert table_version(db.session, table, 'users')[0] == 1
+
+    # What the monolith's hook runs for its own user writes
+    bump_table_version(db.session.connection(), table, 'users')
+    db.session.commit()
+    assert table_version(db.session, table, 'users')[0] == 2